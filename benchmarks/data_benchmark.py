@@ -0,0 +1,88 @@
+"Benchmark of challenge point access and cached table loading in midst.data against pandas."
+
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+import torch
+
+from midst.data import ChallengeDataset, get_table
+
+
+def write_challenge_points(base_dir: str, n_points: int, seed: int) -> None:
+    # Same columns as the transaction table of the single table tasks.
+    rng = np.random.default_rng(seed)
+    challenge_points = pd.DataFrame(
+        {
+            "trans_id": np.arange(n_points),
+            "account_id": rng.integers(0, 5000, n_points),
+            "trans_date": rng.integers(0, 2000, n_points),
+            "trans_type": rng.integers(0, 3, n_points),
+            "operation": rng.integers(0, 6, n_points),
+            "amount": np.round(rng.random(n_points) * 10000, 1),
+            "balance": np.round(rng.random(n_points) * 100000, 1),
+            "k_symbol": rng.integers(0, 9, n_points),
+            "bank": rng.integers(0, 14, n_points),
+            "account": rng.integers(0, 10**8, n_points),
+        }
+    )
+    challenge_points.to_csv(os.path.join(base_dir, "challenge_with_id.csv"), index=False)
+
+
+def best_time(fn: Callable[[], object], repeats: int) -> tuple[float, object]:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def run_benchmark(n_points: int, batch_size: int, repeats: int, seed: int) -> None:
+    with tempfile.TemporaryDirectory() as base_dir:
+        write_challenge_points(base_dir, n_points, seed)
+        challenge_points = pd.read_csv(os.path.join(base_dir, "challenge_with_id.csv"))
+        dataset = ChallengeDataset(base_dir)
+
+        # How ChallengeDataset used to access rows.
+        iloc_time, iloc_rows = best_time(
+            lambda: [torch.from_numpy(challenge_points.iloc[idx].to_numpy(copy=True)) for idx in range(n_points)], repeats
+        )
+        row_time, rows = best_time(lambda: [dataset[idx] for idx in range(n_points)], repeats)
+        batch_time, batches = best_time(
+            lambda: [dataset.get_batch(slice(start, start + batch_size)) for start in range(0, n_points, batch_size)],
+            repeats,
+        )
+        assert torch.equal(torch.stack(iloc_rows), torch.stack(rows))
+        assert torch.equal(torch.cat(batches), dataset.as_tensor())
+
+        print(f"{n_points} challenge points")
+        print(f"pandas iloc rows:     {iloc_time:.4f}s")
+        print(f"dataset rows:         {row_time:.4f}s ({iloc_time / row_time:.1f}x)")
+        print(f"dataset get_batch({batch_size}): {batch_time:.6f}s ({iloc_time / batch_time:.1f}x)")
+
+        # Loading a table again through the memory mapped cache, which the first load created.
+        csv_path = os.path.join(base_dir, "challenge_with_id.csv")
+        csv_time, _ = best_time(lambda: pd.read_csv(csv_path), repeats)
+        dataset_time, _ = best_time(lambda: ChallengeDataset(base_dir), repeats)
+        table_time, table = best_time(lambda: get_table(base_dir, "challenge_with_id.csv"), repeats)
+        assert table.equals(challenge_points)
+
+        print(f"\npd.read_csv:          {csv_time:.4f}s")
+        print(f"cached dataset:       {dataset_time:.4f}s ({csv_time / dataset_time:.1f}x)")
+        print(f"cached get_table:     {table_time:.4f}s ({csv_time / table_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n_points", type=int, default=10**5)
+    parser.add_argument("--batch_size", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run_benchmark(args.n_points, args.batch_size, args.repeats, args.seed)
@@ -0,0 +1,63 @@
+"Benchmark of writing and parsing predictions in the csv and binary formats of midst.ingestion."
+
+import argparse
+import csv
+import os
+import tempfile
+import time
+from typing import Callable
+
+import numpy as np
+
+from midst.ingestion import load_scores, save_scores
+
+
+def write_csv_writer(path: str, predictions: np.ndarray) -> None:
+    # How the starter kits used to write predictions.
+    with open(path, mode="w", newline="") as file:
+        writer = csv.writer(file)
+        for value in list(predictions):
+            writer.writerow([value])
+
+
+def best_time(fn: Callable[[], object], repeats: int) -> tuple[float, object]:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def run_benchmark(size: int, repeats: int, seed: int) -> None:
+    predictions = np.random.default_rng(seed).random(size)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_writer_path = os.path.join(tmp_dir, "csv_writer.csv")
+        csv_path = os.path.join(tmp_dir, "prediction.csv")
+        npy_path = os.path.join(tmp_dir, "prediction.npy")
+
+        print(f"{size} predictions")
+        print(f"{'format':>12} {'write (s)':>10} {'parse (s)':>10} {'size (MB)':>10} {'exact':>6}")
+        for name, path, write, parse in [
+            ("csv.writer", csv_writer_path, write_csv_writer, lambda path: np.loadtxt(path)),
+            ("csv", csv_path, save_scores, load_scores),
+            ("npy", npy_path, save_scores, load_scores),
+        ]:
+            write_time, _ = best_time(lambda: write(path, predictions), repeats)
+            parse_time, loaded = best_time(lambda: parse(path), repeats)
+            exact = bool(np.array_equal(loaded, predictions))
+            print(
+                f"{name:>12} {write_time:>10.4f} {parse_time:>10.4f} "
+                f"{os.path.getsize(path) / 2**20:>10.2f} {str(exact):>6}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=10**6)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run_benchmark(args.size, args.repeats, args.seed)
@@ -0,0 +1,87 @@
+"Micro-benchmark of the sort-based TPR @ FPR engine in midst.metrics against the sklearn roc_curve path."
+
+import argparse
+import time
+from typing import Callable
+
+import numpy as np
+from sklearn.metrics import roc_curve
+
+from midst.metrics import get_roc_metrics_batch, get_tpr_at_fpr, get_tpr_at_fpr_bootstrap
+
+
+def roc_curve_tpr_at_fpr(true_membership: np.ndarray, predictions: np.ndarray, max_fpr: float = 0.1) -> float:
+    fpr, tpr, _ = roc_curve(true_membership, predictions)
+    return max(tpr[fpr < max_fpr])
+
+
+def best_time(fn: Callable[[], float], repeats: int) -> tuple[float, float]:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def run_benchmark(
+    sizes: list[int], n_vectors: int, bootstrap_size: int, n_bootstrap: int, repeats: int, seed: int
+) -> None:
+    rng = np.random.default_rng(seed)
+
+    print(f"{'points':>12} {'roc_curve (s)':>14} {'midst (s)':>10} {'speedup':>8}")
+    for size in sizes:
+        true_membership = rng.integers(0, 2, size)
+        # Rounded scores produce the ties that real attacks output.
+        predictions = np.round(rng.random(size) * 0.5 + true_membership * 0.1, 4)
+
+        baseline_time, baseline = best_time(lambda: roc_curve_tpr_at_fpr(true_membership, predictions), repeats)
+        midst_time, result = best_time(lambda: get_tpr_at_fpr(true_membership, predictions), repeats)
+        assert baseline == result, f"Mismatch at {size} points: {baseline} != {result}"
+
+        print(f"{size:>12} {baseline_time:>14.4f} {midst_time:>10.4f} {baseline_time / midst_time:>7.1f}x")
+
+    # Batched scoring of many attack variants against the same labels.
+    size = sizes[0]
+    true_membership = rng.integers(0, 2, size)
+    predictions = np.round(rng.random((n_vectors, size)) * 0.5 + true_membership * 0.1, 4)
+
+    baseline_time, _ = best_time(
+        lambda: [roc_curve_tpr_at_fpr(true_membership, row) for row in predictions], repeats
+    )
+    midst_time, _ = best_time(lambda: get_roc_metrics_batch(true_membership, predictions), repeats)
+    print(
+        f"\n{n_vectors} vectors x {size} points: roc_curve {baseline_time:.4f}s, "
+        f"midst batch {midst_time:.4f}s ({baseline_time / midst_time:.1f}x)"
+    )
+
+    # Bootstrap confidence interval, resampling the challenge points of one model type.
+    true_membership = rng.integers(0, 2, bootstrap_size)
+    predictions = np.round(rng.random(bootstrap_size) * 0.5 + true_membership * 0.1, 4)
+    indices = np.random.default_rng(seed).integers(0, bootstrap_size, size=(n_bootstrap, bootstrap_size))
+
+    baseline_time, baseline = best_time(
+        lambda: [roc_curve_tpr_at_fpr(true_membership[row], predictions[row]) for row in indices], repeats
+    )
+    midst_time, result = best_time(
+        lambda: get_tpr_at_fpr_bootstrap(true_membership, predictions, n_bootstrap=n_bootstrap, seed=seed), repeats
+    )
+    assert np.allclose(baseline, result.samples), "Mismatch between the bootstrap samples."
+    print(
+        f"{n_bootstrap} bootstrap resamples x {bootstrap_size} points: roc_curve {baseline_time:.4f}s, "
+        f"midst bootstrap {midst_time:.4f}s ({baseline_time / midst_time:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    # 10**8 points needs roughly 6GB of memory for either path.
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10**5, 10**6, 10**7, 10**8])
+    parser.add_argument("--n_vectors", type=int, default=100)
+    parser.add_argument("--bootstrap_size", type=int, default=4000)
+    parser.add_argument("--n_bootstrap", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run_benchmark(args.sizes, args.n_vectors, args.bootstrap_size, args.n_bootstrap, args.repeats, args.seed)
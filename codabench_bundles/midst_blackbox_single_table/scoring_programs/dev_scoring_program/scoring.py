@@ -3,40 +3,33 @@ import os
 import json
 import numpy as np
 
-from sklearn.metrics import roc_curve
+from typing import Optional
 
-
-def get_tpr_at_fpr(true_membership: np.ndarray, predictions: np.ndarray, max_fpr=0.1) -> float:
-    """Calculates the best True Positive Rate when the False Positive Rate is
-    at most `max_fpr`.
-
-    Args:
-        true_membership (List): A list of values in {0,1} indicating the membership of a
-            challenge point. 0: "non-member", 1: "member".
-        predictions (List): A list of values in the range [0,1] indicating the confidence
-            that a challenge point is a member. The closer the value to 1, the more
-            confident the predictor is about the hypothesis that the challenge point is
-            a member.
-        max_fpr (float, optional): Threshold on the FPR. Defaults to 0.1.
-
-    Returns:
-        float: The TPR @ `max_fpr` FPR.
-    """
-    fpr, tpr, _ = roc_curve(true_membership, predictions)
-
-    return max(tpr[fpr < max_fpr])
+# metrics.py, ingestion.py and mappings.py are copies of the midst modules, kept in sync by scripts/sync_scoring_programs.py
+from metrics import StreamingTprAtFpr, get_tpr_at_fpr, get_tpr_at_fpr_bootstrap
+from ingestion import PhaseTimer, find_score_file, get_manifest_extensions, iter_score_files
+from mappings import MappingIndex
 
 
 def score(solutions: np.ndarray, predictions: np.ndarray) -> float:
     return get_tpr_at_fpr(solutions, predictions) 
 
-def get_scores(dev_or_final: str):
+def get_scores(dev_or_final: str, streaming: Optional[str] = None, n_workers: Optional[int] = None, n_bootstrap: int = 0):
     base_solutions_dir = os.path.join('/app/input/', 'ref')
     base_predictions_dir = os.path.join('/app/input/', 'res')
     output_dir = '/app/output/'
 
     tpr_at_fpr_list = []
+    confidence_intervals = {}
+    timer = PhaseTimer()
+    # The manifest of binary submissions records the format of their prediction files.
+    prediction_extensions = get_manifest_extensions(base_predictions_dir)
 
+    # The solutions only contain the mapping files merged across rounds.
+    mapping_index = MappingIndex(base_solutions_dir)
+
+    # Collect the files of every model type first, so that they are all loaded concurrently.
+    model_files = {}
     for model_type in ["tabddpm_black_box", "tabsyn_black_box"]:
         # Skip iteration if model_type directory not in base predictions directory
         if model_type not in os.listdir(base_predictions_dir): continue
@@ -53,48 +46,98 @@ def get_scores(dev_or_final: str):
 
         mapping_file = os.path.join(base_solutions_dir, f"{model_name}_mapping_final.json")
         assert os.path.exists(mapping_file), f"File {mapping_file} does not exist. Please contact competition oragnizers."
-        
-        with open(mapping_file) as f:
-            mapping_data = json.load(f)
 
-        # We compute the scores globally, across the models of the same model type. 
-        # This is somewhat equivalent to having one attack (threshold) for all the attacks.
-        predictions = []
-        solutions  = []
-        for model_id in mapping_data[f"{dev_or_final}_black_box"]:
-            label_path = os.path.join(solutions_dir, model_id, "challenge_label.csv")
-            assert os.path.exists(label_path), f"File {label_path} does not exist. Please contact competition oragnizers."
+        model_files[model_type] = []
+        for model_id in mapping_index.get_folders(model_name, f"{dev_or_final}_black_box"):
+            # Labels and predictions can be stored as .npy or .csv files.
+            label_path = find_score_file(os.path.join(solutions_dir, model_id), "challenge_label")
+            assert label_path is not None, f"File {os.path.join(solutions_dir, model_id, 'challenge_label.csv')} does not exist. Please contact competition oragnizers."
 
-            pred_path = os.path.join(predictions_dir, model_id, "prediction.csv")
-            assert os.path.exists(pred_path), f"File {pred_path} does not exist.\
-                Ensure a predictions.csv file exists for model folders.\
+            pred_path = find_score_file(os.path.join(predictions_dir, model_id), "prediction", prediction_extensions)
+            assert pred_path is not None, f"File {os.path.join(predictions_dir, model_id, 'prediction.csv')} does not exist.\
+                Ensure a prediction.csv or prediction.npy file exists for model folders.\
                 Ex: {model_type}/{dev_or_final}/{model_name}_#/prediction.csv"
 
-            solutions.append(np.loadtxt(label_path, skiprows=1))
-            predictions.append(np.loadtxt(pred_path))
-
-        solutions = np.concatenate(solutions)
-        predictions = np.concatenate(predictions)
+            model_files[model_type].append((label_path, pred_path))
 
-        # Verify that the predictions are valid.
-        assert len(predictions) == len(solutions)
-        assert np.all(predictions >= 0), "Some predictions are < 0"
-        assert np.all(predictions <= 1), "Some predictions are > 1"
+    # Labels and predictions alternate, the csv label files have a header row.
+    paths = [path for files in model_files.values() for pair in files for path in pair]
+    arrays = iter_score_files(paths, [1, 0] * (len(paths) // 2), n_workers=n_workers, timer=timer)
 
-        tpr_at_fpr = score(solutions, predictions)
+    for model_type, files in model_files.items():
+        # We compute the scores globally, across the models of the same model type. 
+        # This is somewhat equivalent to having one attack (threshold) for all the attacks.
+        predictions = []
+        solutions  = []
+        # In streaming mode only per-class counts of the predictions are kept in memory.
+        scorer = StreamingTprAtFpr(mode=streaming) if streaming is not None else None
+        for label_path, pred_path in files:
+            solution = next(arrays)
+            prediction = next(arrays)
+
+            # Verify that the predictions are valid.
+            assert len(prediction) == len(solution), f"Number of predictions in {pred_path} does not match the number of challenge points."
+            assert np.all(prediction >= 0), "Some predictions are < 0"
+            assert np.all(prediction <= 1), "Some predictions are > 1"
+
+            with timer.phase("score"):
+                if scorer is not None:
+                    scorer.update(solution, prediction)
+                else:
+                    solutions.append(solution)
+                    predictions.append(prediction)
+
+        with timer.phase("score"):
+            if scorer is not None:
+                tpr_at_fpr = scorer.get_tpr_at_fpr()
+                print(f"Streaming mode {streaming}, TPR at most {scorer.error_bound()} below the best exact threshold")
+            else:
+                tpr_at_fpr = score(np.concatenate(solutions), np.concatenate(predictions))
         tpr_at_fpr_list.append(tpr_at_fpr)
 
         print(f"{model_type.split('_')[0]} TPR at FPR at FPR == 10%", tpr_at_fpr)
 
+        # Bootstrap confidence intervals need all the predictions, which streaming mode does not keep.
+        if n_bootstrap > 0 and scorer is None:
+            with timer.phase("bootstrap"):
+                interval = get_tpr_at_fpr_bootstrap(
+                    np.concatenate(solutions), np.concatenate(predictions), n_bootstrap=n_bootstrap, seed=0
+                )
+            model_name = model_type.split('_')[0]
+            confidence_intervals[f"{model_name}_tpr_at_fpr_ci_low"] = interval.low
+            confidence_intervals[f"{model_name}_tpr_at_fpr_ci_high"] = interval.high
+            print(f"{model_name} TPR at FPR at FPR == 10% 95% CI", (interval.low, interval.high))
+
+    print("Timings:", timer.report())
+
     assert len(tpr_at_fpr_list) > 0, "We expect to have at least one model type present of TabDDPM and TabSyn."
 
     with open(os.path.join(output_dir, 'scores.json'), 'w') as score_file:
-        score_file.write(json.dumps({"tpr_at_fpr": max(tpr_at_fpr_list)}))
+        score_file.write(json.dumps({"tpr_at_fpr": max(tpr_at_fpr_list), **confidence_intervals}))
 
 
 if __name__ == "__main__":
     argparser = argparse.ArgumentParser()
     argparser.add_argument("--dev_or_final", type=str)
+    argparser.add_argument(
+        "--streaming",
+        type=str,
+        choices=["exact", "histogram"],
+        default=None,
+        help="Score model folders one at a time, keeping only counts of the predictions in memory.",
+    )
+    argparser.add_argument(
+        "--n_bootstrap",
+        type=int,
+        default=0,
+        help="Number of bootstrap resamples of the 95% confidence intervals of the scores, 0 (the default) disables them.",
+    )
+    argparser.add_argument(
+        "--n_workers",
+        type=int,
+        default=None,
+        help="Number of threads reading and processes parsing the score files, 1 loads them sequentially.",
+    )
     args = argparser.parse_args()
 
-    get_scores(args.dev_or_final)
+    get_scores(args.dev_or_final, args.streaming, args.n_workers, args.n_bootstrap)
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import io
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import Iterator, Sequence
+
+import numpy as np
+
+
+# Binary files are preferred when both formats are present, csv files are the fallback.
+SCORE_FILE_EXTENSIONS = (".npy", ".csv")
+MANIFEST_FILE_NAME = "manifest.json"
+
+
+class PhaseTimer:
+    """Accumulates the wall clock time spent in each phase of a scoring run."""
+
+    def __init__(self) -> None:
+        self.timings: dict[str, float] = defaultdict(float)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - start
+
+    def report(self) -> str:
+        return ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.timings.items())
+
+
+def find_score_file(directory: str, name: str, extensions: Sequence[str] = SCORE_FILE_EXTENSIONS) -> str | None:
+    """Returns the path of the score file `name` in `directory`, detecting its format by extension.
+
+    Args:
+        directory (str): Directory containing the file, e.g. a model folder.
+        name (str): File name without extension, e.g. "prediction" or "challenge_label".
+        extensions (Sequence[str], optional): Extensions to look for, in order of preference.
+            Defaults to SCORE_FILE_EXTENSIONS.
+
+    Returns:
+        str | None: Path of the first existing file, or None if there is none.
+    """
+    for extension in extensions:
+        path = os.path.join(directory, name + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def dump_scores(scores: np.ndarray, extension: str) -> bytes:
+    """Serializes a vector of predictions or labels in the format of `extension`, ".npy" or ".csv".
+
+    Csv files contain one value per line, written with enough digits to be read back exactly.
+    """
+    assert extension in SCORE_FILE_EXTENSIONS, f"Unsupported score file format {extension}."
+    scores = np.asarray(scores, dtype=np.float64).ravel()
+    buffer = io.BytesIO()
+    if extension == ".npy":
+        np.save(buffer, scores)
+    else:
+        np.savetxt(buffer, scores, fmt="%.17g")
+    return buffer.getvalue()
+
+
+def save_scores(path: str, scores: np.ndarray) -> None:
+    """Saves a vector of predictions or labels as .npy or .csv, depending on the extension of `path`."""
+    with open(path, "wb") as f:
+        f.write(dump_scores(scores, ".npy" if path.endswith(".npy") else ".csv"))
+
+
+def load_scores(path: str, skiprows: int = 0) -> np.ndarray:
+    """Loads a vector of predictions or labels saved as .npy or .csv.
+
+    Args:
+        path (str): Path of the file.
+        skiprows (int, optional): Number of header rows to skip in csv files. Defaults to 0.
+
+    Returns:
+        np.ndarray: The scores.
+    """
+    with open(path, "rb") as f:
+        return _parse_scores(f.read(), path, skiprows)
+
+
+def get_manifest(paths: Sequence[str]) -> str:
+    """Returns the manifest of a submission, recording the format of its prediction files.
+
+    The manifest is stored as MANIFEST_FILE_NAME at the root of the submission.
+
+    Args:
+        paths (Sequence[str]): Paths of the prediction files, relative to the submission root.
+
+    Returns:
+        str: The manifest, as json.
+    """
+    extensions = {os.path.splitext(path)[1] for path in paths}
+    assert len(extensions) == 1, f"Expected all prediction files in one format, got {extensions}."
+
+    return json.dumps({"format": extensions.pop(), "files": sorted(paths)}, indent=4)
+
+
+def get_manifest_extensions(root: str) -> tuple[str, ...]:
+    """Returns the extensions of the prediction files of a submission.
+
+    Submissions without a manifest may use either format.
+    """
+    manifest_path = os.path.join(root, MANIFEST_FILE_NAME)
+    if not os.path.exists(manifest_path):
+        return SCORE_FILE_EXTENSIONS
+
+    with open(manifest_path) as f:
+        extension = json.load(f)["format"]
+    assert extension in SCORE_FILE_EXTENSIONS, f"Unsupported prediction format {extension} in {manifest_path}."
+    return (extension,)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _parse_scores(content: bytes, path: str, skiprows: int) -> np.ndarray:
+    if path.endswith(".npy"):
+        return np.load(io.BytesIO(content), allow_pickle=False)
+    return np.loadtxt(io.BytesIO(content), skiprows=skiprows)
+
+
+def iter_score_files(
+    paths: Sequence[str],
+    skiprows: Sequence[int],
+    n_workers: int | None = None,
+    batch_size: int = 256,
+    timer: PhaseTimer | None = None,
+) -> Iterator[np.ndarray]:
+    """Loads score files concurrently, yielding the arrays in the order of `paths`.
+
+    The files are read by a thread pool, so that the per-file latency of network filesystems
+    overlaps, and parsed by a process pool. At most `batch_size` files are held in memory at once.
+
+    Args:
+        paths (Sequence[str]): Paths of the .npy or .csv files.
+        skiprows (Sequence[int]): Number of header rows to skip in each csv file.
+        n_workers (int | None, optional): Number of reading threads and parsing processes.
+            If 1, the files are loaded sequentially without any pool. If None, the executors'
+            defaults are used. Defaults to None.
+        batch_size (int, optional): Number of files read before they are parsed. Defaults to 256.
+        timer (PhaseTimer | None, optional): If given, the time spent in the "read" and "parse"
+            phases is added to it. Defaults to None.
+
+    Yields:
+        np.ndarray: The content of each file, as returned by `load_scores`.
+    """
+    assert len(paths) == len(skiprows), "Expected the number of rows to skip of every file."
+    timer = timer if timer is not None else PhaseTimer()
+
+    with ExitStack() as stack:
+        if n_workers == 1:
+            read, parse = map, map
+        else:
+            read_pool = stack.enter_context(ThreadPoolExecutor(max_workers=n_workers))
+            parse_pool = stack.enter_context(ProcessPoolExecutor(max_workers=n_workers))
+            read = read_pool.map
+            # Score files are small, so they are sent to the parsing processes in chunks.
+            parse = lambda fn, *iterables: parse_pool.map(fn, *iterables, chunksize=16)
+
+        for start in range(0, len(paths), batch_size):
+            batch_paths = paths[start : start + batch_size]
+            batch_skiprows = skiprows[start : start + batch_size]
+
+            with timer.phase("read"):
+                contents = list(read(_read_file, batch_paths))
+            with timer.phase("parse"):
+                arrays = list(parse(_parse_scores, contents, batch_paths, batch_skiprows))
+            del contents
+
+            yield from arrays
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Sequence
+
+
+# Mapping files list the model folders of each partition, eg. "shadow" or "dev_black_box", of a model type.
+ROUND_MAPPING_FILES = ("{model}_mapping.json", "{model}_round2_mapping.json")
+MERGED_MAPPING_FILE = "{model}_mapping_final.json"
+
+
+class MappingIndex:
+    """Model folders listed by the mapping files of a data directory, loaded once and merged in memory.
+
+    The mapping file of each round is read on the first lookup of its model type. Merged lookups
+    concatenate the rounds in order, as scripts/merge_mappings.py does, and fall back to the merged
+    mapping file when the round files are absent, eg. in the solutions of a scoring program.
+    The model folders found in a directory are listed once and cached.
+    """
+
+    def __init__(
+        self,
+        base_dir: str,
+        round_mapping_files: Sequence[str] = ROUND_MAPPING_FILES,
+        merged_mapping_file: str = MERGED_MAPPING_FILE,
+    ) -> None:
+        self.base_dir = base_dir
+        self.round_mapping_files = list(round_mapping_files)
+        self.merged_mapping_file = merged_mapping_file
+        self._mappings: dict[str, list[dict[str, list[str]] | None]] = {}
+        self._merged: dict[str, dict[str, list[str]]] = {}
+        self._directories: dict[str, set[str]] = {}
+
+    def _load(self, path: str) -> dict[str, list[str]] | None:
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def get_round_mappings(self, model: str) -> list[dict[str, list[str]] | None]:
+        """Returns the mapping of each round of a model type, None for rounds without a mapping file."""
+        if model not in self._mappings:
+            self._mappings[model] = [
+                self._load(os.path.join(self.base_dir, mapping_file.format(model=model)))
+                for mapping_file in self.round_mapping_files
+            ]
+        return self._mappings[model]
+
+    def get_merged_mapping(self, model: str) -> dict[str, list[str]]:
+        """Returns the mapping of a model type merged across rounds, with the partitions of the first round."""
+        if model not in self._merged:
+            round_mappings = self.get_round_mappings(model)
+            if round_mappings[0] is not None:
+                self._merged[model] = {
+                    key: [folder for mapping in round_mappings if mapping is not None for folder in mapping.get(key, [])]
+                    for key in round_mappings[0]
+                }
+            else:
+                merged_path = os.path.join(self.base_dir, self.merged_mapping_file.format(model=model))
+                merged = self._load(merged_path)
+                if merged is None:
+                    raise FileNotFoundError(f"No mapping file of {model} found in {self.base_dir}.")
+                self._merged[model] = merged
+        return self._merged[model]
+
+    def get_folders(self, model: str, partition: str, round_index: int | None = None) -> list[str]:
+        """Returns the model folders of a partition listed by the mapping files.
+
+        Args:
+            model (str): Model type, eg. "tabddpm".
+            partition (str): Key of the partition, eg. "dev_black_box".
+            round_index (int | None, optional): Index of the round in `round_mapping_files`.
+                Defaults to None, in which case the folders of all rounds are returned.
+
+        Returns:
+            list[str]: The names of the model folders, in the order of the mapping files.
+        """
+        if round_index is None:
+            return self.get_merged_mapping(model)[partition]
+
+        mapping = self.get_round_mappings(model)[round_index]
+        if mapping is None:
+            mapping_file = self.round_mapping_files[round_index].format(model=model)
+            raise FileNotFoundError(f"File {os.path.join(self.base_dir, mapping_file)} not found.")
+        return mapping[partition]
+
+    def list_directories(self, directory: str) -> set[str]:
+        """Returns the names of the subdirectories of a directory, listed on the first call only."""
+        if directory not in self._directories:
+            if os.path.isdir(directory):
+                with os.scandir(directory) as entries:
+                    self._directories[directory] = {entry.name for entry in entries if entry.is_dir()}
+            else:
+                self._directories[directory] = set()
+        return self._directories[directory]
+
+    def get_existing_folders(
+        self, model: str, partition: str, model_dir: str, round_index: int | None = None
+    ) -> list[str]:
+        """Returns the model folders of a partition which exist in `model_dir`, relative to the data directory.
+
+        Args:
+            model (str): Model type, eg. "tabddpm".
+            partition (str): Key of the partition, eg. "dev_black_box".
+            model_dir (str): Directory of the model folders, eg. "tabddpm_round2".
+            round_index (int | None, optional): Index of the round, see `get_folders`. Defaults to None.
+
+        Returns:
+            list[str]: The names of the model folders, in the order of the mapping files.
+        """
+        directories = self.list_directories(os.path.join(self.base_dir, model_dir))
+        return [
+            folder for folder in self.get_folders(model, partition, round_index)
+            if folder in directories and model in folder
+        ]
@@ -0,0 +1,120 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator, Sequence
+
+import numpy as np
+import torch
+
+try:
+    from midst.data import get_challenge_points, get_model_folders
+    from midst.ingestion import save_scores
+except ModuleNotFoundError:
+    # midst/ itself is on the path, as in the starter kits, which import this module as `attack`.
+    from data import get_challenge_points, get_model_folders
+    from ingestion import save_scores
+
+
+# An attack receives all the challenge points of a model folder as a (n_points, n_columns) tensor,
+# along with the path of the folder to access eg. its synthetic data, and returns one membership
+# prediction in [0, 1] per challenge point.
+BatchAttack = Callable[[torch.Tensor, str], torch.Tensor | np.ndarray]
+
+
+def predict_model_folder(attack_model: BatchAttack, model_dir: str, cache_dir: str | None = None) -> np.ndarray:
+    """Runs a batch attack on the challenge points of one model folder and validates its predictions.
+
+    Args:
+        attack_model (BatchAttack): The attack.
+        model_dir (str): Path of the model folder.
+        cache_dir (str | None, optional): Directory of the table cache, see `midst.data.load_table`.
+            Defaults to None.
+
+    Returns:
+        np.ndarray: The predictions, of shape (n_points,).
+    """
+    challenge_points = get_challenge_points(model_dir, cache_dir)
+    predictions = attack_model(challenge_points, model_dir)
+    if isinstance(predictions, torch.Tensor):
+        predictions = predictions.detach().cpu().numpy()
+    predictions = np.asarray(predictions, dtype=np.float64).ravel()
+
+    assert len(predictions) == len(challenge_points), f"Expected one prediction per challenge point in {model_dir}."
+    assert np.all((0 <= predictions) & (predictions <= 1)), f"Some predictions for {model_dir} are not in [0, 1]."
+    return predictions
+
+
+def iter_predictions(
+    attack_model: BatchAttack, model_dirs: Sequence[str], n_workers: int = 1, cache_dir: str | None = None
+) -> Iterator[np.ndarray]:
+    """Runs a batch attack on model folders, yielding the predictions of each folder in order.
+
+    Args:
+        attack_model (BatchAttack): The attack. With several workers, it must be picklable, eg.
+            a function defined at the top level of a module.
+        model_dirs (Sequence[str]): Paths of the model folders.
+        n_workers (int, optional): Number of processes running the attack on model folders in
+            parallel. If 1, the attack runs in this process. Defaults to 1.
+        cache_dir (str | None, optional): Directory of the table cache, see `midst.data.load_table`.
+            Defaults to None.
+
+    Yields:
+        np.ndarray: The predictions of each model folder, of shape (n_points,).
+    """
+    if n_workers == 1:
+        for model_dir in model_dirs:
+            yield predict_model_folder(attack_model, model_dir, cache_dir)
+        return
+
+    n_models = len(model_dirs)
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        yield from executor.map(predict_model_folder, [attack_model] * n_models, model_dirs, [cache_dir] * n_models)
+
+
+def run_attack(
+    base_dir: Path,
+    attack_model: BatchAttack,
+    phases: Sequence[str] = ("train", "dev", "final"),
+    prediction_file_name: str = "prediction.csv",
+    n_workers: int = 1,
+    cache_dir: str | None = None,
+) -> dict[str, float]:
+    """Runs a batch attack over every model folder of each phase and saves its predictions.
+
+    The predictions of a phase are written together, by a thread pool, once the attack has run
+    on all of its model folders.
+
+    Args:
+        base_dir (Path): Directory of a model type, eg. "tabddpm_black_box".
+        attack_model (BatchAttack): The attack. With several workers, it must be picklable, eg.
+            a function defined at the top level of a module.
+        phases (Sequence[str], optional): Phases to run the attack on.
+            Defaults to ("train", "dev", "final").
+        prediction_file_name (str, optional): "prediction.csv" or "prediction.npy", see
+            `midst.ingestion.save_scores`. Defaults to "prediction.csv".
+        n_workers (int, optional): Number of processes running the attack on model folders in
+            parallel. If 1, the attack runs in this process. Defaults to 1.
+        cache_dir (str | None, optional): Directory of the table cache, see `midst.data.load_table`.
+            Defaults to None.
+
+    Returns:
+        dict[str, float]: Throughput of the attack on each phase, in challenge points per second.
+    """
+    throughputs = {}
+    for phase in phases:
+        model_dirs = [os.path.join(base_dir, phase, folder) for folder in get_model_folders(base_dir, phase)]
+
+        start = time.perf_counter()
+        predictions = list(iter_predictions(attack_model, model_dirs, n_workers, cache_dir))
+        elapsed = time.perf_counter() - start
+
+        with ThreadPoolExecutor() as executor:
+            paths = [os.path.join(model_dir, prediction_file_name) for model_dir in model_dirs]
+            list(executor.map(save_scores, paths, predictions))
+
+        n_points = sum(len(model_predictions) for model_predictions in predictions)
+        throughputs[phase] = n_points / elapsed if elapsed > 0 else float("inf")
+        print(f"{base_dir} {phase}: {n_points} challenge points, {throughputs[phase]:.0f} points/s")
+
+    return throughputs
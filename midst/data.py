@@ -1,31 +1,234 @@
+import hashlib
+import json
 import os
+import zipfile
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from typing import IO
 
 import torch
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset
+
+try:
+    from midst.ingestion import SCORE_FILE_EXTENSIONS, _parse_scores, find_score_file, load_scores, save_scores
+except ModuleNotFoundError:
+    # midst/ itself is on the path, as in the starter kits, which import this module as `data`.
+    from ingestion import SCORE_FILE_EXTENSIONS, _parse_scores, find_score_file, load_scores, save_scores
+
+
+# Tables of a model folder that are converted to memory mapped .npy files on their first load.
+CACHED_TABLES = ("challenge_with_id.csv", "train_with_id.csv", "trans_synthetic.csv")
+CACHE_DIR_NAME = ".midst_cache"
+
+# A phase can be packed into one archive, eg. "tabddpm_black_box/dev.zip" in place of the
+# "tabddpm_black_box/dev" directory, see scripts/extract_data.py --archive. Paths inside it,
+# eg. "tabddpm_black_box/dev/tabddpm_3/challenge_with_id.csv", are read without unpacking it.
+ARCHIVE_EXTENSION = ".zip"
+
+
+@lru_cache(maxsize=64)
+def _open_archive(archive_path: str, mtime_ns: int) -> zipfile.ZipFile:
+    # Keyed by modification time, so that a rebuilt archive is opened again.
+    return zipfile.ZipFile(archive_path)
+
+
+def _locate_in_archive(path: str) -> tuple[zipfile.ZipFile, str, str] | None:
+    """Returns the archive containing `path`, its path and the name of the member, if any."""
+    path = Path(path)
+    for parent in path.parents:
+        archive_path = str(parent) + ARCHIVE_EXTENSION
+        if os.path.isfile(archive_path):
+            archive = _open_archive(archive_path, os.stat(archive_path).st_mtime_ns)
+            return archive, archive_path, path.relative_to(parent).as_posix()
+    return None
+
+
+def path_exists(path: str) -> bool:
+    """Returns whether a file exists, either on disk or packed into a phase archive."""
+    if os.path.exists(path):
+        return True
+    located = _locate_in_archive(path)
+    return located is not None and located[2] in located[0].NameToInfo
+
+
+def open_file(path: str) -> IO[bytes]:
+    """Opens a file of a model folder for binary reading, either on disk or packed into a phase archive."""
+    if os.path.exists(path):
+        return open(path, "rb")
+    located = _locate_in_archive(path)
+    if located is None or located[2] not in located[0].NameToInfo: raise FileNotFoundError(f"File {path} not found.")
+    return located[0].open(located[2])
+
+
+def load_table(csv_path: str, cache_dir: str | None = None) -> tuple[np.ndarray, list[str], dict[str, str]]:
+    """Loads a numeric csv table as a float64 array, memory mapped from an .npy cache.
+
+    The cache file is keyed by the path, size and modification time of the csv file, so it is
+    rebuilt whenever the csv file changes, and stale cache files of the table are removed.
+
+    Args:
+        csv_path (str): Path of the csv file.
+        cache_dir (str | None, optional): Directory of the cache files. Defaults to None, in
+            which case a CACHE_DIR_NAME directory next to the csv file, or to its archive, is used.
+
+    Returns:
+        tuple[np.ndarray, list[str], dict[str, str]]: The (n_rows, n_columns) array, opened
+            copy-on-write, the column names and the original dtype of each column.
+    """
+    if not path_exists(csv_path): raise FileNotFoundError(f"Table {csv_path} not found.")
+    if os.path.exists(csv_path):
+        source, stat = os.path.abspath(csv_path), os.stat(csv_path)
+        default_cache_dir = os.path.join(os.path.dirname(csv_path), CACHE_DIR_NAME)
+    else:
+        # Tables of an archive are cached next to it, eg. in "tabddpm_black_box/.midst_cache/dev/tabddpm_3".
+        _, archive_path, member = _locate_in_archive(csv_path)
+        source, stat = f"{os.path.abspath(archive_path)}:{member}", os.stat(archive_path)
+        archive_name = os.path.splitext(os.path.basename(archive_path))[0]
+        default_cache_dir = os.path.join(os.path.dirname(archive_path), CACHE_DIR_NAME, archive_name, os.path.dirname(member))
+    cache_dir = cache_dir if cache_dir is not None else default_cache_dir
+    key = hashlib.sha1(f"{source}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+
+    table_name = os.path.splitext(os.path.basename(csv_path))[0]
+    array_path = os.path.join(cache_dir, f"{table_name}-{key}.npy")
+    metadata_path = os.path.join(cache_dir, f"{table_name}-{key}.json")
+
+    if not (os.path.exists(array_path) and os.path.exists(metadata_path)):
+        with open_file(csv_path) as f:
+            table = pd.read_csv(f)
+        metadata = {"columns": list(table.columns), "dtypes": {column: str(dtype) for column, dtype in table.dtypes.items()}}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        for stale_file in os.listdir(cache_dir):
+            if stale_file.startswith(f"{table_name}-"): os.remove(os.path.join(cache_dir, stale_file))
+
+        # Files are written under a temporary name first, so that an interrupted write is never reused.
+        np.save(array_path + ".tmp.npy", table.to_numpy(dtype=np.float64))
+        with open(metadata_path + ".tmp", "w") as f:
+            json.dump(metadata, f)
+        os.replace(array_path + ".tmp.npy", array_path)
+        os.replace(metadata_path + ".tmp", metadata_path)
+
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+    return np.load(array_path, mmap_mode="c"), metadata["columns"], metadata["dtypes"]
+
+
+def get_table(base_dir: Path, file_name: str, cache_dir: str | None = None) -> pd.DataFrame:
+    """Loads a table of a model folder, eg. "trans_synthetic.csv", through the .npy cache.
+
+    Args:
+        base_dir (Path): Model folder containing the table.
+        file_name (str): Name of the csv file, one of CACHED_TABLES.
+        cache_dir (str | None, optional): Directory of the cache files. Defaults to None, in
+            which case a CACHE_DIR_NAME directory inside `base_dir` is used.
+
+    Returns:
+        pd.DataFrame: The table, with the dtypes of the csv file.
+    """
+    assert file_name in CACHED_TABLES, f"Only {CACHED_TABLES} are cached, got {file_name}."
+    array, columns, dtypes = load_table(os.path.join(base_dir, file_name), cache_dir)
+    return pd.DataFrame(array, columns=columns).astype(dtypes)
 
 class ChallengeDataset(Dataset):
-    def __init__(self, base_dir: Path) -> None:
+    """Challenge points of a model folder, converted once into contiguous tensors.
+
+    All the columns of challenge_with_id.csv are stored, in order, as one float64 tensor so
+    that rows and batches are views of it. The tensor is memory mapped from the .npy cache of
+    `load_table`. The ID columns are also kept separately as int64.
+    """
+
+    def __init__(self, base_dir: Path, cache_dir: str | None = None) -> None:
         self.base_dir = base_dir
 
         challenge_points_path = os.path.join(self.base_dir, "challenge_with_id.csv")
-        if not os.path.exists: raise FileNotFoundError(f"Challenge Points Path: {challenge_points_path} not found.")
-        self.challenge_points = pd.read_csv(challenge_points_path)
+        if not path_exists(challenge_points_path): raise FileNotFoundError(f"Challenge Points Path: {challenge_points_path} not found.")
+        challenge_points, self.columns, _ = load_table(challenge_points_path, cache_dir)
+
+        self.id_columns = [column for column in self.columns if column.endswith("_id")]
+        self.challenge_points = torch.from_numpy(challenge_points)
+        id_indices = [self.columns.index(column) for column in self.id_columns]
+        self.ids = torch.from_numpy(challenge_points[:, id_indices].astype(np.int64))
 
     def __len__(self) -> int:
         return len(self.challenge_points)
     
     def __getitem__(self, idx) -> torch.Tensor:
-        x = self.challenge_points.iloc[idx].to_numpy()
-        return torch.from_numpy(x)
+        return self.challenge_points[idx]
+
+    def get_batch(self, index: slice) -> torch.Tensor:
+        """Returns the challenge points in `index` as a view, without copying them."""
+        return self.challenge_points[index]
+
+    def as_tensor(self) -> torch.Tensor:
+        """Returns all the challenge points as a (n_points, n_columns) tensor, without copying them."""
+        return self.challenge_points
+
+def get_challenge_points(base_dir: Path, cache_dir: str | None = None) -> torch.Tensor: 
+    return ChallengeDataset(base_dir, cache_dir).as_tensor()
+
+def get_model_folders(base_dir: Path, phase: str) -> list[str]:
+    """Returns the model folders of a phase, eg. "train", sorted by model number as in the starter kits.
+
+    The phase is either a directory or an archive, see ARCHIVE_EXTENSION.
+    """
+    root = os.path.join(base_dir, phase)
+    if not os.path.isdir(root) and os.path.isfile(root + ARCHIVE_EXTENSION):
+        archive = _open_archive(root + ARCHIVE_EXTENSION, os.stat(root + ARCHIVE_EXTENSION).st_mtime_ns)
+        model_folders = list({name.split("/")[0] for name in archive.namelist() if "/" in name})
+    else:
+        model_folders = [folder for folder in os.listdir(root) if os.path.isdir(os.path.join(root, folder))]
+    return sorted(model_folders, key=lambda folder: int(folder.split("_")[1]))
+
+def get_phase_challenge_points(
+    base_dir: Path, phase: str, n_workers: int | None = None, cache_dir: str | None = None
+) -> tuple[torch.Tensor, list[str]]:
+    """Loads the challenge points of every model folder of a phase into one stacked tensor.
+
+    The model folders are loaded in parallel by a thread pool.
+
+    Args:
+        base_dir (Path): Directory of a model type, eg. "tabddpm_black_box".
+        phase (str): One of "train", "dev" or "final".
+        n_workers (int | None, optional): Number of loading threads. Defaults to None, the
+            default of ThreadPoolExecutor.
+        cache_dir (str | None, optional): Directory of the cache files, see `load_table`.
+            Defaults to None.
+
+    Returns:
+        tuple[torch.Tensor, list[str]]: The (n_models, n_points, n_columns) tensor of challenge
+            points and the name of the model folder of each entry of its first dimension.
+    """
+    model_folders = get_model_folders(base_dir, phase)
+    paths = [os.path.join(base_dir, phase, folder) for folder in model_folders]
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        challenge_points = list(executor.map(lambda path: get_challenge_points(path, cache_dir), paths))
 
-def get_challenge_points(base_dir: Path) -> torch.Tensor: 
-    dataset = ChallengeDataset(base_dir)
+    shapes = {tuple(points.shape) for points in challenge_points}
+    assert len(shapes) == 1, f"Expected the same number of challenge points in every model folder, got {shapes}."
+    return torch.stack(challenge_points), model_folders
 
-    loader = DataLoader(dataset, batch_size=200)
-    challenge_points = next(iter(loader))
+def get_challenge_labels(base_dir: Path) -> np.ndarray:
+    """Loads the membership labels of the challenge points from challenge_label.npy or challenge_label.csv."""
+    label_path = find_score_file(base_dir, "challenge_label")
+    if label_path is not None:
+        return load_scores(label_path, skiprows=1)
 
-    return challenge_points
+    for extension in SCORE_FILE_EXTENSIONS:
+        label_path = os.path.join(base_dir, "challenge_label" + extension)
+        if path_exists(label_path):
+            with open_file(label_path) as f:
+                return _parse_scores(f.read(), label_path, skiprows=1)
+    raise FileNotFoundError(f"Challenge labels not found in {base_dir}.")
 
+def get_predictions(base_dir: Path) -> np.ndarray:
+    """Loads the membership predictions from prediction.npy or prediction.csv."""
+    prediction_path = find_score_file(base_dir, "prediction")
+    if prediction_path is None: raise FileNotFoundError(f"Predictions not found in {base_dir}.")
+    return load_scores(prediction_path)
 
+def save_predictions(base_dir: Path, predictions: np.ndarray, binary: bool = False) -> None:
+    """Saves the membership predictions as prediction.npy if `binary`, otherwise as prediction.csv."""
+    save_scores(os.path.join(base_dir, "prediction.npy" if binary else "prediction.csv"), predictions)
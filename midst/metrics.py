@@ -1,4 +1,253 @@
-from sklearn.metrics import roc_curve
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+
+
+@dataclass
+class RocMetrics:
+    """ROC curve and summary statistics obtained from a single sort of the predictions.
+
+    Attributes:
+        fpr (np.ndarray): False Positive Rates of the ROC curve, starting at 0.
+        tpr (np.ndarray): True Positive Rates of the ROC curve, starting at 0.
+        thresholds (np.ndarray): Decreasing thresholds used to compute `fpr` and `tpr`.
+            The first threshold is `np.inf`.
+        auc (float): Area under the ROC curve.
+        tpr_at_fpr (dict[float, float]): Mapping from a maximum FPR to the best TPR whose
+            FPR is strictly below it.
+    """
+
+    fpr: np.ndarray
+    tpr: np.ndarray
+    thresholds: np.ndarray
+    auc: float
+    tpr_at_fpr: dict[float, float]
+
+
+def _validate_labels(
+    true_membership: Sequence | np.ndarray, require_both_classes: bool = True
+) -> tuple[np.ndarray, int, int]:
+    """Converts the membership labels to a boolean array and counts members and non-members."""
+    labels = np.asarray(true_membership).ravel()
+    if labels.dtype != bool:
+        if not np.all((labels == 0) | (labels == 1)):
+            raise ValueError("Membership labels must be in {0, 1}.")
+        labels = labels.astype(bool)
+
+    n_positives = int(np.count_nonzero(labels))
+    n_negatives = len(labels) - n_positives
+    if require_both_classes and (n_positives == 0 or n_negatives == 0):
+        raise ValueError("Membership labels must contain both members and non-members.")
+
+    return labels, n_positives, n_negatives
+
+
+def _roc_points(
+    labels: np.ndarray, predictions: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Computes the ROC operating points of every row of `predictions` with one sort per row.
+
+    The points of all rows are returned flattened, row after row. The points are the same as
+    the ones produced by `sklearn.metrics.roc_curve(..., drop_intermediate=False)` without the
+    leading (0, 0) point, and `kept` flags the points `drop_intermediate=True` would retain.
+
+    Args:
+        labels (np.ndarray): Boolean membership labels of shape (n_points,), shared by all the
+            rows, or of shape (n_vectors, n_points).
+        predictions (np.ndarray): Predictions of shape (n_vectors, n_points).
+
+    Returns:
+        tuple: True positive counts, false positive counts, thresholds, a boolean mask of the
+            points kept by `drop_intermediate` and the offset of the first point of each row.
+    """
+    n_vectors, n_points = predictions.shape
+
+    order = np.argsort(predictions, axis=1)[:, ::-1]
+    sorted_predictions = np.take_along_axis(predictions, order, axis=1)
+    sorted_labels = labels[order] if labels.ndim == 1 else np.take_along_axis(labels, order, axis=1)
+    true_positives = np.cumsum(sorted_labels, axis=1, dtype=np.int64)
+    del sorted_labels
+    del order
+
+    # A threshold is placed after the last occurrence of each distinct prediction value.
+    is_threshold = np.empty((n_vectors, n_points), dtype=bool)
+    np.not_equal(sorted_predictions[:, 1:], sorted_predictions[:, :-1], out=is_threshold[:, :-1])
+    is_threshold[:, -1] = True
+
+    row_index, point_index = np.nonzero(is_threshold)
+    tps = true_positives[row_index, point_index]
+    fps = point_index + 1 - tps
+    thresholds = sorted_predictions[row_index, point_index]
+
+    row_starts = np.searchsorted(row_index, np.arange(n_vectors))
+    row_ends = np.append(row_starts[1:], len(tps)) - 1
+
+    # Drop points that are collinear with their neighbours, as `roc_curve` does by default.
+    kept = np.ones(len(tps), dtype=bool)
+    kept[1:-1] = (np.diff(tps, 2) != 0) | (np.diff(fps, 2) != 0)
+    kept[row_starts] = True
+    kept[row_ends] = True
+
+    return tps, fps, thresholds, kept, row_starts
+
+
+def _auc_from_points(
+    tps: np.ndarray, fps: np.ndarray, row_starts: np.ndarray, n_positives: int, n_negatives: int
+) -> np.ndarray:
+    """Computes the trapezoidal area under the ROC curve of every row of flattened points."""
+    previous_tps = np.empty_like(tps)
+    previous_fps = np.empty_like(fps)
+    previous_tps[1:], previous_fps[1:] = tps[:-1], fps[:-1]
+    previous_tps[row_starts] = 0
+    previous_fps[row_starts] = 0
+
+    areas = (fps - previous_fps) * (tps + previous_tps) / 2.0
+    return np.add.reduceat(areas, row_starts) / (n_positives * n_negatives)
+
+
+def _tpr_at_fpr_from_points(
+    tps: np.ndarray,
+    fps: np.ndarray,
+    kept: np.ndarray,
+    row_starts: np.ndarray,
+    n_positives: int | np.ndarray,
+    n_negatives: int | np.ndarray,
+    max_fprs: Sequence[float],
+) -> np.ndarray:
+    """Computes the TPR @ each of `max_fprs` FPR for every row of flattened points.
+
+    The class counts are either shared by all the rows or given per row.
+    """
+    if len(max_fprs) == 0:
+        return np.empty((len(row_starts), 0))
+
+    if np.ndim(n_positives) > 0:
+        point_rows = np.repeat(np.arange(len(row_starts)), np.diff(row_starts, append=len(tps)))
+        n_positives, n_negatives = n_positives[point_rows], n_negatives[point_rows]
+
+    fpr = fps / n_negatives
+    tpr = tps / n_positives
+    # TPR is non-decreasing along a row, so the best TPR is the largest eligible one. Points
+    # that are not eligible fall back to the (0, 0) point that starts every ROC curve.
+    return np.stack(
+        [np.maximum.reduceat(np.where(kept & (fpr < max_fpr), tpr, 0.0), row_starts) for max_fpr in max_fprs],
+        axis=1,
+    )
+
+
+def get_roc_metrics(
+    true_membership: Sequence | np.ndarray,
+    predictions: Sequence | np.ndarray,
+    max_fprs: Sequence[float] = (0.1,),
+) -> RocMetrics:
+    """Computes the ROC curve, its AUC and the TPR at several FPR thresholds in a single pass.
+
+    The ROC curve matches `sklearn.metrics.roc_curve` with its default arguments.
+
+    Args:
+        true_membership (Sequence | np.ndarray): Values in {0,1} indicating the membership of a
+            challenge point. 0: "non-member", 1: "member".
+        predictions (Sequence | np.ndarray): Values in the range [0,1] indicating the confidence
+            that a challenge point is a member.
+        max_fprs (Sequence[float], optional): Thresholds on the FPR. Defaults to (0.1,).
+
+    Returns:
+        RocMetrics: The ROC curve, the AUC and the TPR @ each of `max_fprs` FPR.
+    """
+    labels, n_positives, n_negatives = _validate_labels(true_membership)
+    predictions = np.asarray(predictions, dtype=np.float64).reshape(1, -1)
+    assert predictions.shape[1] == len(labels), "Predictions and labels must have the same length."
+
+    tps, fps, thresholds, kept, row_starts = _roc_points(labels, predictions)
+    auc = _auc_from_points(tps, fps, row_starts, n_positives, n_negatives)[0]
+    tpr_at_fpr = _tpr_at_fpr_from_points(tps, fps, kept, row_starts, n_positives, n_negatives, max_fprs)[0]
+
+    return RocMetrics(
+        fpr=np.concatenate([[0.0], fps[kept] / n_negatives]),
+        tpr=np.concatenate([[0.0], tps[kept] / n_positives]),
+        thresholds=np.concatenate([[np.inf], thresholds[kept]]),
+        auc=float(auc),
+        tpr_at_fpr={max_fpr: float(tpr) for max_fpr, tpr in zip(max_fprs, tpr_at_fpr)},
+    )
+
+
+def get_roc_metrics_batch(
+    true_membership: Sequence | np.ndarray,
+    predictions: np.ndarray,
+    max_fprs: Sequence[float] = (0.1,),
+    max_chunk_elements: int = 2**24,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Scores several prediction vectors against the same membership labels.
+
+    The labels are validated and counted once, and the prediction vectors are sorted
+    together, `max_chunk_elements` predictions at a time to bound memory usage.
+
+    Args:
+        true_membership (Sequence | np.ndarray): Values in {0,1} indicating the membership of a
+            challenge point. 0: "non-member", 1: "member".
+        predictions (np.ndarray): Array of shape (n_vectors, n_points) where each row holds the
+            predictions of one attack for every challenge point.
+        max_fprs (Sequence[float], optional): Thresholds on the FPR. Defaults to (0.1,).
+        max_chunk_elements (int, optional): Maximum number of predictions sorted at once.
+            Defaults to 2**24.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The TPR @ each of `max_fprs` FPR, of shape
+            (n_vectors, len(max_fprs)), and the AUC of each vector, of shape (n_vectors,).
+    """
+    labels, n_positives, n_negatives = _validate_labels(true_membership)
+    predictions = np.atleast_2d(np.asarray(predictions, dtype=np.float64))
+    assert predictions.shape[1] == len(labels), "Predictions and labels must have the same length."
+
+    rows_per_chunk = max(1, max_chunk_elements // len(labels))
+    tpr_at_fpr = np.empty((len(predictions), len(max_fprs)))
+    auc = np.empty(len(predictions))
+    for start in range(0, len(predictions), rows_per_chunk):
+        chunk = slice(start, start + rows_per_chunk)
+        tps, fps, _, kept, row_starts = _roc_points(labels, predictions[chunk])
+        auc[chunk] = _auc_from_points(tps, fps, row_starts, n_positives, n_negatives)
+        tpr_at_fpr[chunk] = _tpr_at_fpr_from_points(
+            tps, fps, kept, row_starts, n_positives, n_negatives, max_fprs
+        )
+
+    return tpr_at_fpr, auc
+
+
+def get_roc_curve(
+    true_membership: Sequence | np.ndarray, predictions: Sequence | np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Computes the ROC curve, equivalent to `sklearn.metrics.roc_curve` with default arguments.
+
+    Args:
+        true_membership (Sequence | np.ndarray): Values in {0,1} indicating the membership of a
+            challenge point. 0: "non-member", 1: "member".
+        predictions (Sequence | np.ndarray): Values in the range [0,1] indicating the confidence
+            that a challenge point is a member.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: The FPR, TPR and thresholds of the curve.
+    """
+    metrics = get_roc_metrics(true_membership, predictions, max_fprs=())
+    return metrics.fpr, metrics.tpr, metrics.thresholds
+
+
+def get_auc(true_membership: Sequence | np.ndarray, predictions: Sequence | np.ndarray) -> float:
+    """Computes the area under the ROC curve.
+
+    Args:
+        true_membership (Sequence | np.ndarray): Values in {0,1} indicating the membership of a
+            challenge point. 0: "non-member", 1: "member".
+        predictions (Sequence | np.ndarray): Values in the range [0,1] indicating the confidence
+            that a challenge point is a member.
+
+    Returns:
+        float: The AUC.
+    """
+    return get_roc_metrics(true_membership, predictions, max_fprs=()).auc
+
 
 def get_tpr_at_fpr(true_membership: list, predictions: list, max_fpr=0.1) -> float:
     """Calculates the best True Positive Rate when the False Positive Rate is
@@ -16,6 +265,186 @@ def get_tpr_at_fpr(true_membership: list, predictions: list, max_fpr=0.1) -> flo
     Returns:
         float: The TPR @ `max_fpr` FPR.
     """
-    fpr, tpr, _ = roc_curve(true_membership, predictions)
+    return get_roc_metrics(true_membership, predictions, max_fprs=(max_fpr,)).tpr_at_fpr[max_fpr]
+
+
+@dataclass
+class BootstrapInterval:
+    """Bootstrap confidence interval of a metric.
+
+    Attributes:
+        estimate (float): Value of the metric on the original sample.
+        low (float): Lower bound of the confidence interval.
+        high (float): Upper bound of the confidence interval.
+        samples (np.ndarray): Values of the metric on each resample.
+    """
+
+    estimate: float
+    low: float
+    high: float
+    samples: np.ndarray
+
+
+def get_tpr_at_fpr_bootstrap(
+    true_membership: Sequence | np.ndarray,
+    predictions: Sequence | np.ndarray,
+    max_fpr: float = 0.1,
+    n_bootstrap: int = 1000,
+    confidence: float = 0.95,
+    seed: int | None = None,
+    max_chunk_elements: int = 2**24,
+) -> BootstrapInterval:
+    """Computes a percentile bootstrap confidence interval of the TPR @ `max_fpr` FPR.
+
+    The resamples are drawn as one (n_bootstrap, n_points) matrix of indices and all of them
+    are scored with one batched sort, `max_chunk_elements` predictions at a time to bound
+    memory usage. Resamples containing a single class have no TPR and are ignored.
+
+    Args:
+        true_membership (Sequence | np.ndarray): Values in {0,1} indicating the membership of a
+            challenge point. 0: "non-member", 1: "member".
+        predictions (Sequence | np.ndarray): Values in the range [0,1] indicating the confidence
+            that a challenge point is a member.
+        max_fpr (float, optional): Threshold on the FPR. Defaults to 0.1.
+        n_bootstrap (int, optional): Number of resamples. Defaults to 1000.
+        confidence (float, optional): Confidence level of the interval. Defaults to 0.95.
+        seed (int | None, optional): Seed of the resampling. Defaults to None.
+        max_chunk_elements (int, optional): Maximum number of resampled predictions sorted at
+            once. Defaults to 2**24.
+
+    Returns:
+        BootstrapInterval: The TPR @ `max_fpr` FPR and its confidence interval.
+    """
+    labels, _, _ = _validate_labels(true_membership)
+    predictions = np.asarray(predictions, dtype=np.float64).ravel()
+    assert len(predictions) == len(labels), "Predictions and labels must have the same length."
+    assert n_bootstrap > 0, "Expected at least one bootstrap resample."
+
+    n_points = len(labels)
+    # Drawing the rows of the index matrix chunk by chunk gives the same matrix as drawing it at once.
+    rng = np.random.default_rng(seed)
+    rows_per_chunk = max(1, max_chunk_elements // n_points)
+    samples = np.empty(n_bootstrap)
+    for start in range(0, n_bootstrap, rows_per_chunk):
+        n_rows = min(rows_per_chunk, n_bootstrap - start)
+        indices = rng.integers(0, n_points, size=(n_rows, n_points))
+        resampled_labels = labels[indices]
+        n_positives = np.count_nonzero(resampled_labels, axis=1)
+        n_negatives = n_points - n_positives
+
+        tps, fps, _, kept, row_starts = _roc_points(resampled_labels, predictions[indices])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tpr_at_fpr = _tpr_at_fpr_from_points(
+                tps, fps, kept, row_starts, n_positives, n_negatives, (max_fpr,)
+            )[:, 0]
+        tpr_at_fpr[(n_positives == 0) | (n_negatives == 0)] = np.nan
+        samples[start : start + n_rows] = tpr_at_fpr
+
+    alpha = 1.0 - confidence
+    low, high = np.nanquantile(samples, [alpha / 2, 1.0 - alpha / 2])
+    return BootstrapInterval(
+        estimate=get_tpr_at_fpr(labels, predictions, max_fpr),
+        low=float(low),
+        high=float(high),
+        samples=samples,
+    )
+
+
+class StreamingTprAtFpr:
+    """Computes the TPR @ FPR of predictions received one model folder at a time.
+
+    Only per-class counts of the predictions are kept, so the predictions of all the models
+    never need to be held in memory together.
+
+    - In "exact" mode, the counts are kept per distinct prediction value. The result is
+      identical to `get_tpr_at_fpr` on the concatenated predictions and memory grows with the
+      number of distinct prediction values.
+    - In "histogram" mode, the counts are kept in `n_bins` equal-width bins over [0, 1], so
+      memory is fixed. Thresholds are restricted to bin edges, each of which is a threshold of
+      the exact ROC curve, so the result is never above the best TPR over all the thresholds of
+      the exact curve and at most `error_bound()` below it: no threshold inside a bin can gain
+      more than the members falling in that bin. Without tied predictions, that best TPR is
+      `get_tpr_at_fpr`. With ties, `get_tpr_at_fpr` drops collinear points as
+      `sklearn.metrics.roc_curve` does, which can lower it, so the histogram result can be
+      above it.
+    """
+
+    def __init__(self, mode: str = "exact", n_bins: int = 2**16) -> None:
+        assert mode in ["exact", "histogram"], f"Unknown streaming mode: {mode}"
+        self.mode = mode
+        self.n_bins = n_bins
+
+        # Prediction values and the number of non-members (column 0) and members (column 1)
+        # that received each value. Values are sorted in increasing order.
+        self.values = np.empty(0, dtype=np.float64)
+        self.counts = np.zeros((n_bins, 2), dtype=np.int64) if mode == "histogram" else np.empty((0, 2), dtype=np.int64)
+
+    def update(self, true_membership: Sequence | np.ndarray, predictions: Sequence | np.ndarray) -> None:
+        """Adds the labels and predictions of one batch of challenge points, eg. one model folder.
+
+        Args:
+            true_membership (Sequence | np.ndarray): Values in {0,1} indicating the membership of
+                a challenge point. 0: "non-member", 1: "member".
+            predictions (Sequence | np.ndarray): Values in the range [0,1] indicating the
+                confidence that a challenge point is a member.
+        """
+        labels, _, _ = _validate_labels(true_membership, require_both_classes=False)
+        predictions = np.asarray(predictions, dtype=np.float64).ravel()
+        assert len(predictions) == len(labels), "Predictions and labels must have the same length."
+
+        if self.mode == "histogram":
+            bins = np.clip((predictions * self.n_bins).astype(np.int64), 0, self.n_bins - 1)
+            self.counts += np.stack(
+                [np.bincount(bins[~labels], minlength=self.n_bins), np.bincount(bins[labels], minlength=self.n_bins)],
+                axis=1,
+            )
+            return
+
+        new_values, inverse = np.unique(predictions, return_inverse=True)
+        new_counts = np.zeros((len(new_values), 2), dtype=np.int64)
+        np.add.at(new_counts, (inverse, labels.astype(np.int64)), 1)
+
+        # Merge into the sorted values seen so far in linear time instead of re-sorting them.
+        positions = np.searchsorted(self.values, new_values)
+        seen = positions < len(self.values)
+        seen[seen] = self.values[positions[seen]] == new_values[seen]
+        self.counts[positions[seen]] += new_counts[seen]
+        self.values = np.insert(self.values, positions[~seen], new_values[~seen])
+        self.counts = np.insert(self.counts, positions[~seen], new_counts[~seen], axis=0)
+
+    def get_tpr_at_fpr(self, max_fpr: float = 0.1) -> float:
+        """Calculates the best True Positive Rate when the False Positive Rate is
+        at most `max_fpr` over all the challenge points seen so far.
+
+        Args:
+            max_fpr (float, optional): Threshold on the FPR. Defaults to 0.1.
+
+        Returns:
+            float: The TPR @ `max_fpr` FPR.
+        """
+        # Thresholds are visited from the highest prediction to the lowest.
+        counts = self.counts[::-1]
+        counts = counts[counts.sum(axis=1) > 0]
+        n_negatives, n_positives = counts.sum(axis=0)
+        if n_positives == 0 or n_negatives == 0:
+            raise ValueError("Membership labels must contain both members and non-members.")
+
+        fps = np.cumsum(counts[:, 0])
+        tps = np.cumsum(counts[:, 1])
+        kept = np.ones(len(tps), dtype=bool)
+        if self.mode == "exact":
+            kept[1:-1] = (np.diff(tps, 2) != 0) | (np.diff(fps, 2) != 0)
+
+        eligible = kept & (fps / n_negatives < max_fpr)
+        return float(np.max(tps[eligible] / n_positives, initial=0.0))
+
+    def error_bound(self) -> float:
+        """Returns the largest amount by which `get_tpr_at_fpr` can be below the best TPR over
+        all the thresholds of the exact ROC curve.
 
-    return max(tpr[fpr < max_fpr])
+        Returns:
+            float: 0 in "exact" mode, the largest fraction of members in a single bin otherwise.
+        """
+        if self.mode == "exact":
+            return 0.0
+        return float(self.counts[:, 1].max() / self.counts[:, 1].sum())
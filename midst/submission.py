@@ -0,0 +1,221 @@
+"Packages the predictions of attacks into a submission archive, without writing prediction files."
+
+import argparse
+import importlib
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+try:
+    from midst.attack import BatchAttack, iter_predictions
+    from midst.data import get_model_folders, path_exists
+    from midst.ingestion import MANIFEST_FILE_NAME, dump_scores, get_manifest
+except ModuleNotFoundError:
+    # midst/ itself is on the path, as in the starter kits.
+    from attack import BatchAttack, iter_predictions
+    from data import get_model_folders, path_exists
+    from ingestion import MANIFEST_FILE_NAME, dump_scores, get_manifest
+
+
+class SubmissionArchive:
+    """Zip archive of a submission to which predictions are added as they are produced.
+
+    Members are compressed and written by a background thread, so that a batch of members is
+    compressed while the attacks produce the next one. An archive that was closed before all of
+    its predictions were added can be reopened with `resume=True` to add the missing ones.
+
+    Resuming only covers archives that were closed, which the context manager also does when an
+    attack raises or the run is interrupted with Ctrl-C. A process that is killed outright, eg. by
+    SIGKILL or running out of memory, leaves an archive without its central directory, which is
+    not a valid zip file and is rebuilt from scratch.
+    """
+
+    def __init__(self, zip_path: str, resume: bool = True, compresslevel: int = 6) -> None:
+        self.zip_path = zip_path
+        self.compresslevel = compresslevel
+        # A single thread, since a zip archive can only be written one member at a time.
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = None
+
+        mode = "w"
+        if resume and os.path.exists(zip_path):
+            if zipfile.is_zipfile(zip_path):
+                mode = "a"
+            else:
+                print(f"{zip_path} is not a valid zip file, eg. its last run was killed, and is rebuilt from scratch.")
+        self.zipf = zipfile.ZipFile(zip_path, mode)
+
+    def __enter__(self) -> "SubmissionArchive":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __contains__(self, arcname: str) -> bool:
+        return arcname in self.zipf.NameToInfo
+
+    def close(self) -> None:
+        try:
+            if self.pending is not None:
+                self.pending.result()
+        finally:
+            self.executor.shutdown()
+            self.zipf.close()
+
+    def _write(self, members: dict[str, bytes]) -> None:
+        for arcname, data in members.items():
+            zinfo = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            zinfo.external_attr = 0o644 << 16
+            self.zipf.writestr(zinfo, data, compresslevel=self.compresslevel)
+
+    def add(self, members: dict[str, bytes]) -> None:
+        """Compresses and appends members to the archive in the background.
+
+        Args:
+            members (dict[str, bytes]): Content of each member, by name in the archive.
+        """
+        # Only one batch is written at a time, which bounds the memory held by pending members.
+        if self.pending is not None:
+            self.pending.result()
+        self.pending = self.executor.submit(self._write, dict(members))
+
+
+def get_expected_model_folders(base_dir: Path, phase: str, mapping_file: str | None = None) -> list[str]:
+    """Returns the model folders of a phase that a submission must contain predictions for.
+
+    With a mapping file, eg. "tabddpm_mapping_final.json", all of the model folders it lists
+    for the phase must exist with their challenge points, otherwise an error listing every
+    missing folder is raised. Without one, the model folders found in `base_dir` are used.
+
+    Args:
+        base_dir (Path): Directory of a model type, eg. "tabddpm_black_box".
+        phase (str): "dev" or "final".
+        mapping_file (str | None, optional): Path of the mapping file. Defaults to None.
+
+    Returns:
+        list[str]: The names of the model folders.
+    """
+    if mapping_file is None:
+        return get_model_folders(base_dir, phase)
+
+    with open(mapping_file) as f:
+        mapping_data = json.load(f)
+
+    # Eg. "tabddpm_black_box" is listed under "dev_black_box" and "final_black_box".
+    access = os.path.basename(os.path.normpath(base_dir)).split("_", 1)[1]
+    model_folders = mapping_data[f"{phase}_{access}"]
+    missing = [
+        folder
+        for folder in model_folders
+        if not path_exists(os.path.join(base_dir, phase, folder, "challenge_with_id.csv"))
+    ]
+    if len(missing) > 0:
+        raise FileNotFoundError(f"Challenge points of {phase} model folders {missing} not found in {base_dir}.")
+    return model_folders
+
+
+def package_submission(
+    zip_path: str,
+    attacks: dict[str, BatchAttack],
+    phases: Sequence[str] = ("dev", "final"),
+    mapping_files: dict[str, str] | None = None,
+    prediction_file_name: str = "prediction.csv",
+    resume: bool = True,
+    n_workers: int = 1,
+    cache_dir: str | None = None,
+) -> None:
+    """Runs attacks over the model folders of a submission and streams their predictions into a zip.
+
+    The model folders of every phase are validated before any attack runs. With `resume`, the
+    predictions already in the archive are kept and their attacks are not run again.
+
+    Args:
+        zip_path (str): Path of the submission archive.
+        attacks (dict[str, BatchAttack]): Attack of each model type, by directory of the model
+            type, eg. {"tabddpm_black_box": tabddpm_attack_model}.
+        phases (Sequence[str], optional): Phases of the submission. Defaults to ("dev", "final").
+        mapping_files (dict[str, str] | None, optional): Mapping file of each model type, by
+            directory of the model type, see `get_expected_model_folders`. Defaults to None.
+        prediction_file_name (str, optional): "prediction.csv" or "prediction.npy".
+            Defaults to "prediction.csv".
+        resume (bool, optional): Whether to add to an existing archive instead of rebuilding it,
+            see `SubmissionArchive`. Defaults to True.
+        n_workers (int, optional): Number of processes running the attacks, see
+            `midst.attack.iter_predictions`. Defaults to 1.
+        cache_dir (str | None, optional): Directory of the table cache, see `midst.data.load_table`.
+            Defaults to None.
+    """
+    mapping_files = mapping_files if mapping_files is not None else {}
+    extension = os.path.splitext(prediction_file_name)[1]
+
+    arcnames = {}
+    for base_dir in attacks:
+        for phase in phases:
+            model_folders = get_expected_model_folders(base_dir, phase, mapping_files.get(base_dir))
+            model_type = os.path.basename(os.path.normpath(base_dir))
+            arcnames[base_dir, phase] = {
+                folder: "/".join([model_type, phase, folder, prediction_file_name]) for folder in model_folders
+            }
+
+    with SubmissionArchive(zip_path, resume) as archive:
+        if MANIFEST_FILE_NAME in archive:
+            print(f"{zip_path} is already complete.")
+            return
+
+        for (base_dir, phase), phase_arcnames in arcnames.items():
+            missing = [folder for folder, arcname in phase_arcnames.items() if arcname not in archive]
+            if len(missing) < len(phase_arcnames):
+                print(f"{base_dir} {phase}: resuming, {len(phase_arcnames) - len(missing)} model folders already packaged.")
+
+            model_dirs = [os.path.join(base_dir, phase, folder) for folder in missing]
+            predictions = iter_predictions(attacks[base_dir], model_dirs, n_workers, cache_dir)
+            # Members are added in batches, so that a batch is compressed while the next one is predicted.
+            batch = {}
+            for folder, model_predictions in zip(missing, predictions):
+                batch[phase_arcnames[folder]] = dump_scores(model_predictions, extension)
+                if len(batch) == 16:
+                    archive.add(batch)
+                    batch = {}
+            archive.add(batch)
+
+        all_arcnames = [arcname for phase_arcnames in arcnames.values() for arcname in phase_arcnames.values()]
+        archive.add({MANIFEST_FILE_NAME: get_manifest(all_arcnames).encode()})
+
+
+def import_attack(name: str) -> BatchAttack:
+    """Imports an attack given as "module:function"."""
+    module_name, function_name = name.split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--zip_path", type=str, required=True)
+    parser.add_argument("--base_dirs", type=str, nargs="+", required=True, help="Eg. tabddpm_black_box tabsyn_black_box.")
+    parser.add_argument(
+        "--attacks", type=str, nargs="+", required=True, help="Attack of each base dir, as module:function."
+    )
+    parser.add_argument("--mapping_files", type=str, nargs="*", default=None, help="Mapping file of each base dir.")
+    parser.add_argument("--phases", type=str, nargs="+", default=["dev", "final"])
+    parser.add_argument("--prediction_file_name", type=str, default="prediction.csv")
+    parser.add_argument("--no_resume", action="store_true", help="Rebuild the archive from scratch.")
+    parser.add_argument("--n_workers", type=int, default=1)
+    args = parser.parse_args()
+
+    assert len(args.attacks) == len(args.base_dirs), "Expected one attack per base dir."
+    package_submission(
+        args.zip_path,
+        {base_dir: import_attack(attack) for base_dir, attack in zip(args.base_dirs, args.attacks)},
+        phases=args.phases,
+        mapping_files=dict(zip(args.base_dirs, args.mapping_files)) if args.mapping_files else None,
+        prediction_file_name=args.prediction_file_name,
+        resume=not args.no_resume,
+        n_workers=args.n_workers,
+    )
@@ -0,0 +1,118 @@
+"""Benchmark of decode_samples against the per-column decoding it replaces, on CPU.
+
+Run from this directory with `python -m benchmarks.decoding_benchmark`.
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import lib
+from benchmarks.sampling_benchmark import best_time
+from pipeline_modules import get_T_dict, get_table_info
+from pipeline_utils import decode_samples, get_decoding_info, get_real_df
+from scripts.utils_train import make_dataset_from_df
+
+
+NUM_CLUSTERS = 50
+CATEGORICAL_COLUMNS = ["trans_type", "operation", "k_symbol", "bank"]
+
+
+def build_table(num_rows: int, seed: int) -> tuple[pd.DataFrame, dict]:
+    # Shaped like the transaction table of berka: amount and balance, discrete
+    # columns that samples are rounded to, and the categories of trans_type,
+    # operation, k_symbol and bank.
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "amount": rng.lognormal(7, 1.5, num_rows),
+            "balance": rng.normal(40000, 20000, num_rows),
+            "day": rng.integers(1, 29, num_rows).astype(float),
+            "weekday": rng.integers(0, 7, num_rows).astype(float),
+            "trans_type": rng.choice(["PRIJEM", "VYDAJ", "VYBER"], num_rows),
+            "operation": rng.choice([f"operation_{i}" for i in range(6)], num_rows),
+            "k_symbol": rng.choice([f"k_symbol_{i}" for i in range(9)], num_rows),
+            "bank": rng.choice(list("ABCDEFGHIJKLMN"), num_rows),
+            "cluster": rng.integers(0, NUM_CLUSTERS, num_rows),
+        }
+    )
+    domain_dict = {
+        col: {"type": "discrete" if col in CATEGORICAL_COLUMNS else "continuous"} for col in df.columns[:-1]
+    }
+    return df, get_table_info(df, domain_dict, "cluster")
+
+
+def legacy_decode(
+    X_gen: np.ndarray, y_gen: np.ndarray, df: pd.DataFrame, df_info: dict, dataset: lib.Dataset, label_encoders: dict
+) -> pd.DataFrame:
+    # How sample_from_diffusion and conditional_sampling used to decode samples.
+    num_numerical_features = dataset.X_num["train"].shape[1]
+    X_num_real = df[df_info["num_cols"]].to_numpy().astype(float)
+    X_cat_real = df[df_info["cat_cols"]].to_numpy().astype(str)
+
+    X_num_ = dataset.num_transform.inverse_transform(X_gen[:, :num_numerical_features])
+    actual_num_numerical_features = num_numerical_features - len(label_encoders)
+    X_num = X_num_[:, :actual_num_numerical_features]
+    X_cat = np.round(X_num_[:, actual_num_numerical_features:]).astype(int)
+    decoded_x_cat = []
+    for col in range(X_cat.shape[1]):
+        decoded_x_cat.append(label_encoders[col].inverse_transform(X_cat[:, col]))
+    X_cat = np.column_stack(decoded_x_cat)
+
+    disc_cols = []
+    for col in range(X_num_real.shape[1]):
+        uniq_vals = np.unique(X_num_real[:, col])
+        if len(uniq_vals) <= 32 and ((uniq_vals - np.round(uniq_vals)) == 0).all():
+            disc_cols.append(col)
+    if len(disc_cols):
+        X_num = lib.round_columns(X_num_real, X_num, disc_cols)
+
+    gen_real = np.concatenate((X_num, X_cat, np.round(y_gen.reshape(-1, 1)).astype(int)), axis=1)
+    df_gen = pd.DataFrame(gen_real)
+    df_gen.columns = [str(x) for x in list(df_gen.columns)]
+    for col in df_gen.columns:
+        if X_num_real.shape[1] <= int(col) < X_num_real.shape[1] + X_cat_real.shape[1]:
+            df_gen[col] = df_gen[col].astype(str)
+        else:
+            df_gen[col] = df_gen[col].astype(float)
+    return df_gen
+
+
+def run_benchmark(num_samples: int, num_real_rows: int, repeats: int, seed: int) -> None:
+    df, df_info = build_table(num_real_rows, seed)
+    dataset, label_encoders, _ = make_dataset_from_df(
+        df, lib.Transformations(**get_T_dict()), is_y_cond="none", ratios=[0.99, 0.005, 0.005], df_info=df_info, std=0
+    )
+    # Samples of the model are in the space of the quantile transform.
+    rng = np.random.default_rng(seed)
+    X_gen = rng.standard_normal((num_samples, dataset.X_num["train"].shape[1]), dtype=np.float32)
+    y_gen = rng.integers(0, NUM_CLUSTERS, num_samples)
+
+    info_time, decoding_info = best_time(
+        lambda: get_decoding_info(df, df_info, dataset, label_encoders, "none"), repeats
+    )
+    legacy_time, legacy_df = best_time(
+        lambda: legacy_decode(X_gen, y_gen, df, df_info, dataset, label_encoders), repeats
+    )
+    decode_time, decoded_df = best_time(lambda: decode_samples(X_gen, y_gen, decoding_info), repeats)
+    pd.testing.assert_frame_equal(legacy_df, decoded_df)
+    assert list(get_real_df(df, df_info).columns) == list(decoded_df.columns)
+
+    print(f"{num_samples} generated rows, {num_real_rows} real rows")
+    print(f"per-column decoding: {num_samples / legacy_time:.0f} rows/s")
+    print(
+        f"decode_samples:      {num_samples / decode_time:.0f} rows/s ({legacy_time / decode_time:.2f}x), "
+        f"get_decoding_info once per model in {info_time:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_samples", type=int, default=1_000_000)
+    parser.add_argument("--num_real_rows", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run_benchmark(args.num_samples, args.num_real_rows, args.repeats, args.seed)
@@ -0,0 +1,95 @@
+"""Benchmark of classifier-guided sampling with ClassifierGuidance against the cond_fn it replaces, on CPU.
+
+Run from this directory with `python -m benchmarks.guidance_benchmark`.
+"""
+
+import argparse
+
+import torch
+import torch.nn.functional as F
+
+from benchmarks.sampling_benchmark import D_LAYERS, NUM_CLASSES, NUM_NUMERICAL_FEATURES, best_time, build_diffusion
+from pipeline_utils import Classifier, ClassifierGuidance
+
+
+# Classifier of configs/berka.json, over its clusters.
+CLASSIFIER_D_LAYERS = [128, 256, 512, 1024, 512, 256, 128]
+CLASSIFIER_DIM_T = 128
+NUM_CLUSTERS = 50
+
+
+def build_classifier(seed: int) -> Classifier:
+    # Weights are random, which does not change the cost of guidance.
+    torch.manual_seed(seed)
+    classifier = Classifier(
+        d_in=NUM_NUMERICAL_FEATURES,
+        d_out=NUM_CLUSTERS,
+        dim_t=CLASSIFIER_DIM_T,
+        hidden_sizes=CLASSIFIER_D_LAYERS,
+    )
+    return classifier.eval()
+
+
+def get_autograd_cond_fn(classifier: Classifier, classifier_scale: float):
+    # How conditional_sampling_by_group_size used to guide sampling.
+    def cond_fn(x, t, y=None):
+        with torch.enable_grad():
+            x_in = x.detach().requires_grad_(True).float()
+            logits = classifier(x_in, t)
+            log_probs = F.log_softmax(logits, dim=-1)
+            selected = log_probs[range(len(logits)), y.view(-1)]
+            return torch.autograd.grad(selected.sum(), x_in)[0] * classifier_scale
+
+    return cond_fn
+
+
+def run_benchmark(
+    num_samples: int, num_timesteps: int, d_layers: list[int], guidance_fraction: float, repeats: int, seed: int
+) -> None:
+    diffusion = build_diffusion(num_timesteps, d_layers, seed)
+    classifier = build_classifier(seed)
+    ys = torch.randint(0, NUM_CLUSTERS, (num_samples, 1))
+    model_kwargs = {"y": ys}
+
+    autograd_cond_fn = get_autograd_cond_fn(classifier, 1.0)
+    guidance = ClassifierGuidance(classifier, 1.0)
+    x = torch.randn(num_samples, NUM_NUMERICAL_FEATURES)
+    t = torch.full((num_samples,), num_timesteps // 2)
+    assert torch.allclose(autograd_cond_fn(x, t, y=ys), guidance(x, t, y=ys), atol=1e-6)
+
+    # Guidance on the least noisy timesteps only.
+    interval_guidance = ClassifierGuidance(classifier, 1.0, (0, int(guidance_fraction * num_timesteps) - 1))
+
+    def sample(cond_fn):
+        return diffusion.conditional_sample(ys, model_kwargs=model_kwargs, cond_fn=cond_fn)
+
+    unguided_time, _ = best_time(lambda: sample(None), repeats)
+    autograd_time, _ = best_time(lambda: sample(autograd_cond_fn), repeats)
+    guidance_time, _ = best_time(lambda: sample(guidance), repeats)
+    interval_time, _ = best_time(lambda: sample(interval_guidance), repeats)
+
+    print(f"{num_samples} rows, {num_timesteps} timesteps, {torch.get_num_threads()} threads")
+    print(f"no guidance:            {num_samples / unguided_time:.0f} rows/s")
+    print(f"autograd cond_fn:       {num_samples / autograd_time:.0f} rows/s")
+    print(f"ClassifierGuidance:     {num_samples / guidance_time:.0f} rows/s ({autograd_time / guidance_time:.2f}x)")
+    print(
+        f"guidance on {guidance_fraction:.0%} of timesteps: {num_samples / interval_time:.0f} rows/s "
+        f"({autograd_time / interval_time:.2f}x)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_samples", type=int, default=2000)
+    parser.add_argument("--num_timesteps", type=int, default=50, help="2000 in configs/berka.json.")
+    parser.add_argument("--d_layers", type=int, nargs="+", default=D_LAYERS)
+    parser.add_argument(
+        "--guidance_fraction", type=float, default=0.5, help="Fraction of the timesteps of the guidance interval."
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run_benchmark(
+        args.num_samples, args.num_timesteps, args.d_layers, args.guidance_fraction, args.repeats, args.seed
+    )
@@ -0,0 +1,81 @@
+"""Benchmark of the speed and quality of the CPU inference options of the sampling engine on a trained table model.
+
+Run from this directory with `python -m benchmarks.inference_benchmark --config_path configs/berka.json`,
+after complex_pipeline.py trained the models of the config.
+"""
+
+import argparse
+
+import pandas as pd
+
+from benchmarks.respacing_benchmark import load_root_table, sample_table
+from eval.eval_density import eval_density
+from pipeline_utils import get_df_without_id
+
+
+# Sampling options of each mode, see GaussianMultinomialDiffusion.configure_sampling.
+MODES = {
+    "default": {"inference_mode": False, "autocast_dtype": None},
+    "inference_mode": {"inference_mode": True, "autocast_dtype": None},
+    "inference_mode + bfloat16": {"inference_mode": True, "autocast_dtype": "bfloat16"},
+}
+
+
+def get_density_info(domain_dict: dict) -> dict:
+    # The info of eval_density, with the columns in the order of the domain and no target column.
+    columns = list(domain_dict)
+    return {
+        "num_col_idx": [i for i, col in enumerate(columns) if domain_dict[col]["type"] != "discrete"],
+        "cat_col_idx": [i for i, col in enumerate(columns) if domain_dict[col]["type"] == "discrete"],
+        "target_col_idx": [],
+        "task_type": "None",
+        "metadata": {
+            "columns": {
+                i: {"sdtype": "categorical" if domain_dict[col]["type"] == "discrete" else "numerical"}
+                for i, col in enumerate(columns)
+            }
+        },
+    }
+
+
+def run_benchmark(config_path: str, table: str | None, all_num_threads: list[int], sample_size: int | None) -> None:
+    configs, table, result, table_data = load_root_table(config_path, table)
+    df = get_df_without_id(table_data["df"])
+    domain_dict = table_data["domain"]
+    real_df = table_data["original_df"][list(domain_dict)]
+    info = get_density_info(domain_dict)
+    sample_size = len(df) if sample_size is None else sample_size
+
+    rows = []
+    for num_threads in all_num_threads:
+        for mode, options in MODES.items():
+            result["diffusion"].configure_sampling(num_threads=num_threads, **options)
+            sampling_time, generated = sample_table(result, df, sample_size, configs["sampling"]["batch_size"])
+            quality_report, _ = eval_density(real_df, generated[list(domain_dict)], info)
+            shape, trend = quality_report.get_properties()["Score"][:2]
+            rows.append(
+                {
+                    "mode": mode,
+                    "threads": num_threads,
+                    "time (s)": sampling_time,
+                    "rows/s": sample_size / sampling_time,
+                    "shape": shape,
+                    "trend": trend,
+                }
+            )
+
+    report = pd.DataFrame(rows)
+    report["speedup"] = report["time (s)"].iloc[0] / report["time (s)"]
+    print(f"{table}: {sample_size} rows")
+    print(report.to_string(index=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config_path", type=str, default="configs/berka.json")
+    parser.add_argument("--table", type=str, default=None, help="Defaults to the first table without a parent.")
+    parser.add_argument("--num_threads", type=int, nargs="+", default=[1], help="Intra-op threads of each run.")
+    parser.add_argument("--sample_size", type=int, default=None, help="Defaults to the size of the real table.")
+    args = parser.parse_args()
+
+    run_benchmark(args.config_path, args.table, args.num_threads, args.sample_size)
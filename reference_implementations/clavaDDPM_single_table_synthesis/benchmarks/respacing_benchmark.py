@@ -0,0 +1,98 @@
+"""Benchmark of the quality and speed of sampling a trained table model with fewer steps of the reverse process.
+
+Run from this directory with `python -m benchmarks.respacing_benchmark --config_path configs/berka.json`,
+after complex_pipeline.py trained the models of the config.
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+from complex_pipeline import clava_clustering, clava_load_pretrained, load_configs
+from gen_single_report import compute_alpha_beta, compute_detection
+from pipeline_utils import get_df_without_id, load_multi_table, sample_from_diffusion
+
+
+def sample_table(result: dict, df: pd.DataFrame, sample_size: int, batch_size: int) -> tuple[float, pd.DataFrame]:
+    start = time.perf_counter()
+    _, generated = sample_from_diffusion(
+        df=df,
+        df_info=result["df_info"],
+        diffusion=result["diffusion"],
+        dataset=result["dataset"],
+        label_encoders=result["label_encoders"],
+        sample_size=sample_size,
+        model_params=result["model_params"],
+        T_dict=result["T_dict"],
+        sample_batch_size=batch_size,
+        decoding_info=result.get("decoding_info"),
+    )
+    sampling_time = time.perf_counter() - start
+
+    df_info = result["df_info"]
+    generated.columns = df_info["num_cols"] + df_info["cat_cols"] + [df_info["y_col"]]
+    return sampling_time, generated.apply(pd.to_numeric)
+
+
+def load_root_table(config_path: str, table: str | None) -> tuple[dict, str, dict, dict]:
+    """Loads the trained model of a table without a parent, with the clustered and original tables.
+
+    Returns:
+        tuple[dict, str, dict, dict]: The configs, the name of the table, its model, see
+            clava_training, and its entry in the tables of load_multi_table.
+    """
+    configs, save_dir = load_configs(config_path)
+    tables, relation_order, _ = load_multi_table(configs["general"]["data_dir"])
+    tables, _ = clava_clustering(tables, relation_order, save_dir, configs)
+    models = clava_load_pretrained(relation_order, save_dir)
+
+    # Tables without a parent are sampled by sample_from_diffusion, the others need their parent.
+    roots = [child for parent, child in relation_order if parent is None]
+    table = roots[0] if table is None else table
+    assert table in roots, f"{table} is not one of the tables without a parent: {roots}."
+    return configs, table, models[(None, table)], tables[table]
+
+
+def run_benchmark(config_path: str, table: str | None, all_sampling_steps: list[int], sample_size: int | None) -> None:
+    configs, table, result, table_data = load_root_table(config_path, table)
+    df = get_df_without_id(table_data["df"])
+    domain_dict = table_data["domain"]
+    real_df = table_data["original_df"][list(domain_dict)]
+    sample_size = len(df) if sample_size is None else sample_size
+    num_timesteps = result["diffusion"].num_timesteps
+
+    rows = []
+    # None runs every timestep, which the respaced schedules are compared to.
+    for sampling_steps in [None] + all_sampling_steps:
+        result["diffusion"].configure_sampling(sampling_steps=sampling_steps)
+        sampling_time, generated = sample_table(result, df, sample_size, configs["sampling"]["batch_size"])
+        syn_df = generated[list(domain_dict)]
+        alpha, beta = compute_alpha_beta(real_df, syn_df, domain_dict)
+        detection = compute_detection(syn_df, real_df, domain_dict)
+        rows.append(
+            {
+                "steps": num_timesteps if sampling_steps is None else sampling_steps,
+                "time (s)": sampling_time,
+                "rows/s": sample_size / sampling_time,
+                "alpha": alpha,
+                "beta": beta,
+                "detection": detection,
+            }
+        )
+
+    report = pd.DataFrame(rows)
+    report["speedup"] = report["time (s)"].iloc[0] / report["time (s)"]
+    print(f"{table}: {sample_size} rows, {num_timesteps} timesteps")
+    print(report.to_string(index=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config_path", type=str, default="configs/berka.json")
+    parser.add_argument("--table", type=str, default=None, help="Defaults to the first table without a parent.")
+    parser.add_argument("--sampling_steps", type=int, nargs="+", default=[25, 50, 100, 250])
+    parser.add_argument("--sample_size", type=int, default=None, help="Defaults to the size of the real table.")
+    args = parser.parse_args()
+
+    run_benchmark(args.config_path, args.table, args.sampling_steps, args.sample_size)
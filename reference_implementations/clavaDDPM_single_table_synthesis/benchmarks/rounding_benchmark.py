@@ -0,0 +1,58 @@
+"""Benchmark of lib.round_columns against the cdist nearest-value search it replaces, on CPU.
+
+Run from this directory with `python -m benchmarks.rounding_benchmark`.
+"""
+
+import argparse
+
+import numpy as np
+from scipy.spatial.distance import cdist
+
+import lib
+from benchmarks.sampling_benchmark import best_time
+
+
+def cdist_round_columns(X_real: np.ndarray, X_synth: np.ndarray, columns: list[int]) -> np.ndarray:
+    # How round_columns used to snap values, with a distance matrix of every value to every distinct value.
+    for col in columns:
+        uniq = np.unique(X_real[:, col])
+        dist = cdist(X_synth[:, col][:, np.newaxis].astype(float), uniq[:, np.newaxis].astype(float))
+        X_synth[:, col] = uniq[dist.argmin(axis=1)]
+    return X_synth
+
+
+def run_benchmark(num_samples: int, all_num_unique: list[int], chunk_size: int, repeats: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    # One discrete column of each number of distinct values, like the day of the month with 31.
+    X_real = np.column_stack([rng.integers(0, num_unique, 10_000) for num_unique in all_num_unique]).astype(float)
+    X_synth = (rng.random((num_samples, len(all_num_unique))) * np.array(all_num_unique)).astype(np.float32)
+    columns = list(range(len(all_num_unique)))
+
+    print(f"{num_samples} rows, chunks of {chunk_size} rows")
+    for col, num_unique in enumerate(all_num_unique):
+        cdist_time, cdist_rounded = best_time(lambda: cdist_round_columns(X_real, X_synth.copy(), [col]), repeats)
+        rounded_time, rounded = best_time(
+            lambda: lib.round_columns(X_real, X_synth.copy(), [col], chunk_size=chunk_size), repeats
+        )
+        assert np.array_equal(cdist_rounded, rounded)
+        print(
+            f"{num_unique:5d} distinct values: cdist {num_samples / cdist_time:.0f} rows/s, "
+            f"searchsorted {num_samples / rounded_time:.0f} rows/s ({cdist_time / rounded_time:.2f}x)"
+        )
+
+    all_time, _ = best_time(lambda: lib.round_columns(X_real, X_synth.copy(), columns, chunk_size=chunk_size), repeats)
+    print(f"all columns with searchsorted: {num_samples / all_time:.0f} rows/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_samples", type=int, default=1_000_000)
+    parser.add_argument(
+        "--num_unique", type=int, nargs="+", default=[2, 7, 31, 256], help="Distinct values of each discrete column."
+    )
+    parser.add_argument("--chunk_size", type=int, default=1 << 20)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run_benchmark(args.num_samples, args.num_unique, args.chunk_size, args.repeats, args.seed)
@@ -0,0 +1,120 @@
+"""Benchmark of the sampling engine of GaussianMultinomialDiffusion against the per-step sampling loop, on CPU.
+
+Run from this directory with `python -m benchmarks.sampling_benchmark`.
+"""
+
+import argparse
+import time
+from typing import Callable
+
+import numpy as np
+import torch
+
+from tab_ddpm import GaussianMultinomialDiffusion
+from tab_ddpm.modules import MLPDiffusion
+from tab_ddpm.utils import ohe_to_categories
+
+
+# Shape of the transaction table of berka: its numerical columns, and the
+# categories of trans_type, operation, k_symbol and bank.
+NUM_NUMERICAL_FEATURES = 4
+NUM_CLASSES = [3, 6, 9, 14]
+# Denoiser of configs/berka.json.
+D_LAYERS = [512, 1024, 1024, 1024, 1024, 512]
+
+
+def build_diffusion(num_timesteps: int, d_layers: list[int], seed: int) -> GaussianMultinomialDiffusion:
+    # Weights are random, which does not change the cost of sampling.
+    torch.manual_seed(seed)
+    denoise_fn = MLPDiffusion(
+        d_in=NUM_NUMERICAL_FEATURES + sum(NUM_CLASSES),
+        num_classes=0,
+        is_y_cond="none",
+        rtdl_params={"d_layers": d_layers, "dropout": 0.0},
+    )
+    diffusion = GaussianMultinomialDiffusion(
+        num_classes=np.array(NUM_CLASSES),
+        num_numerical_features=NUM_NUMERICAL_FEATURES,
+        denoise_fn=denoise_fn,
+        num_timesteps=num_timesteps,
+        device=torch.device("cpu"),
+    )
+    return diffusion.eval()
+
+
+@torch.no_grad()
+def per_step_sample(diffusion: GaussianMultinomialDiffusion, num_samples: int) -> torch.Tensor:
+    # How sample used to run the reverse process.
+    b = num_samples
+    z_norm = torch.randn((b, diffusion.num_numerical_features))
+    log_z = diffusion.log_sample_categorical(torch.zeros((b, len(diffusion.num_classes_expanded))))
+    out_dict = {"y": torch.zeros(b, dtype=torch.long)}
+    for i in reversed(range(0, diffusion.num_timesteps)):
+        print(f"Sample timestep {i:4d}", end="\r")
+        t = torch.full((b,), i, dtype=torch.long)
+        model_out = diffusion._denoise_fn(torch.cat([z_norm, log_z], dim=1).float(), t, **out_dict)
+        z_norm = diffusion.gaussian_p_sample(
+            model_out[:, : diffusion.num_numerical_features], z_norm, t, clip_denoised=False
+        )["sample"]
+        log_z = diffusion.p_sample(model_out[:, diffusion.num_numerical_features :], log_z, t, out_dict)
+    print()
+    z_cat = ohe_to_categories(torch.exp(log_z).round(), diffusion.num_classes)
+    return torch.cat([z_norm, z_cat], dim=1)
+
+
+def best_time(fn: Callable[[], object], repeats: int) -> tuple[float, object]:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def run_benchmark(
+    num_samples: int, num_timesteps: int, d_layers: list[int], repeats: int, compile: bool, n_workers: int, seed: int
+) -> None:
+    diffusion = build_diffusion(num_timesteps, d_layers, seed)
+    y_dist = torch.ones(1)
+
+    per_step_time, per_step_samples = best_time(lambda: per_step_sample(diffusion, num_samples), repeats)
+    engine_time, (engine_samples, _) = best_time(lambda: diffusion.sample(num_samples, y_dist), repeats)
+    assert engine_samples.shape == per_step_samples.shape
+
+    print(f"{num_samples} rows, {num_timesteps} timesteps, {torch.get_num_threads()} threads")
+    print(f"per-step loop:  {num_samples / per_step_time:.0f} rows/s")
+    print(f"engine:         {num_samples / engine_time:.0f} rows/s ({per_step_time / engine_time:.2f}x)")
+
+    if n_workers > 1:
+        batch_size = -(-num_samples // n_workers)
+        single_time, (single_samples, _) = best_time(
+            lambda: diffusion.sample_all(num_samples, batch_size, y_dist, n_workers=1, seed=seed), repeats
+        )
+        workers_time, (workers_samples, _) = best_time(
+            lambda: diffusion.sample_all(num_samples, batch_size, y_dist, n_workers=n_workers, seed=seed), repeats
+        )
+        assert torch.equal(single_samples, workers_samples)
+        print(f"sample_all, 1 worker:  {num_samples / single_time:.0f} rows/s")
+        print(f"sample_all, {n_workers} workers: {num_samples / workers_time:.0f} rows/s ({single_time / workers_time:.2f}x)")
+
+    if compile:
+        diffusion.configure_sampling(compile=True)
+        # The first call compiles the denoiser and the sampling steps.
+        compile_time, _ = best_time(lambda: diffusion.sample(num_samples, y_dist), 1)
+        compiled_time, _ = best_time(lambda: diffusion.sample(num_samples, y_dist), repeats)
+        print(f"compiled:       {num_samples / compiled_time:.0f} rows/s ({per_step_time / compiled_time:.2f}x), "
+              f"compiled in {compile_time - compiled_time:.1f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_samples", type=int, default=2000)
+    parser.add_argument("--num_timesteps", type=int, default=50, help="2000 in configs/berka.json.")
+    parser.add_argument("--d_layers", type=int, nargs="+", default=D_LAYERS)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--compile", action="store_true", help="Also benchmark the engine with torch.compile.")
+    parser.add_argument("--n_workers", type=int, default=1, help="Also benchmark sample_all on several processes.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run_benchmark(args.num_samples, args.num_timesteps, args.d_layers, args.repeats, args.compile, args.n_workers, args.seed)
@@ -92,6 +92,17 @@ def clava_synthesizing(tables, relation_order, save_dir, all_group_lengths_prob_
     synthesizing_start_time = time.time()
     synthetic_tables = {}
 
+    for result in models.values():
+        result['diffusion'].configure_sampling(
+            compile=configs['sampling'].get('compile', False),
+            sampling_steps=configs['sampling'].get('sampling_steps'),
+            n_workers=configs['sampling'].get('n_workers', 1),
+            seed=configs['sampling'].get('seed'),
+            inference_mode=configs['sampling'].get('inference_mode', False),
+            autocast_dtype=configs['sampling'].get('autocast_dtype'),
+            num_threads=configs['sampling'].get('num_threads'),
+        )
+
     # Synthesize
     for parent, child in relation_order:
         print(f'Generating {parent} -> {child}')
@@ -111,7 +122,8 @@ def clava_synthesizing(tables, relation_order, save_dir, all_group_lengths_prob_
                 sample_size=int(sample_scale * len(df_without_id)),
                 model_params=result['model_params'],
                 T_dict=result['T_dict'],
-                sample_batch_size=configs['sampling']['batch_size']
+                sample_batch_size=configs['sampling']['batch_size'],
+                decoding_info=result.get('decoding_info'),
             )
             child_keys = list(range(len(child_generated)))
             generated_final_arr = np.concatenate(
@@ -157,6 +169,9 @@ def clava_synthesizing(tables, relation_order, save_dir, all_group_lengths_prob_
                 sample_batch_size=configs['sampling']['batch_size'],
                 is_y_cond='none',
                 classifier_scale=configs['sampling']['classifier_scale'],
+                guidance_interval=configs['sampling'].get('guidance_interval'),
+                rng=configs['sampling'].get('seed'),
+                decoding_info=child_result.get('decoding_info'),
             )
 
             child_foreign_keys = np.repeat(parent_keys, child_sampled_group_sizes, axis=0).reshape((-1, 1))
@@ -2,6 +2,7 @@ import numpy as np
 import pandas as pd
 import os 
 
+import copy
 import json
 
 # Metrics
@@ -10,13 +11,6 @@ from sdmetrics.reports.single_table import QualityReport, DiagnosticReport
 
 import argparse
 
-parser = argparse.ArgumentParser()
-parser.add_argument('--dataname', type=str, default='adult')
-parser.add_argument('--model', type=str, default='tabsyn')
-parser.add_argument('--path', type=str, default = None, help='The file path of the synthetic data')
-
-args = parser.parse_args()
-
 
 def reorder(real_data, syn_data, info):
     num_col_idx = info['num_col_idx']
@@ -59,7 +53,41 @@ def reorder(real_data, syn_data, info):
 
     return new_real_data, new_syn_data, metadata
 
+def eval_density(real_data, syn_data, info):
+    """
+    Generate the sdmetrics quality and diagnostic reports of synthetic data, whose Shape and
+    Trend scores are the low-order statistics reported by this script.
+
+    :param info: the info of the dataset, with its column indices and sdmetrics metadata.
+    :return: the quality report and the diagnostic report.
+    """
+    real_data = real_data.copy()
+    syn_data = syn_data.copy()
+    real_data.columns = range(len(real_data.columns))
+    syn_data.columns = range(len(syn_data.columns))
+
+    # reorder modifies the info in place.
+    info = copy.deepcopy(info)
+    metadata = info['metadata']
+    metadata['columns'] = {int(key): value for key, value in metadata['columns'].items()}
+
+    new_real_data, new_syn_data, metadata = reorder(real_data, syn_data, info)
+
+    qual_report = QualityReport()
+    qual_report.generate(new_real_data, new_syn_data, metadata)
+
+    diag_report = DiagnosticReport()
+    diag_report.generate(new_real_data, new_syn_data, metadata)
+
+    return qual_report, diag_report
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dataname', type=str, default='adult')
+    parser.add_argument('--model', type=str, default='tabsyn')
+    parser.add_argument('--path', type=str, default = None, help='The file path of the synthetic data')
+
+    args = parser.parse_args()
 
     dataname = args.dataname
     model = args.model
@@ -84,19 +112,7 @@ if __name__ == '__main__':
     if not os.path.exists(save_dir):
         os.makedirs(save_dir)
 
-    real_data.columns = range(len(real_data.columns))
-    syn_data.columns = range(len(syn_data.columns))
-
-    metadata = info['metadata']
-    metadata['columns'] = {int(key): value for key, value in metadata['columns'].items()}
-
-    new_real_data, new_syn_data, metadata = reorder(real_data, syn_data, info)
-
-    qual_report = QualityReport()
-    qual_report.generate(new_real_data, new_syn_data, metadata)
-
-    diag_report = DiagnosticReport()
-    diag_report.generate(new_real_data, new_syn_data, metadata)
+    qual_report, diag_report = eval_density(real_data, syn_data, info)
 
     quality =  qual_report.get_properties()
     diag = diag_report.get_properties()
@@ -16,7 +16,6 @@ import os
 from category_encoders import LeaveOneOutEncoder
 from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import StandardScaler
-from scipy.spatial.distance import cdist
 
 from . import util
 from .metrics import calculate_metrics as calculate_metrics_
@@ -624,11 +623,23 @@ def prepare_fast_torch_dataloader(
     dataloader = FastTensorDataLoader(X, y, batch_size=batch_size, shuffle=(split=='train'))
     return dataloader
 
-def round_columns(X_real, X_synth, columns):
+def round_columns(X_real, X_synth, columns, chunk_size=1 << 20):
+    """
+    Snaps the values of each of the columns of X_synth, in place, to the nearest distinct value
+    of the column in X_real, the smaller one on ties.
+
+    The distinct values are sorted, so np.searchsorted finds the two candidates of each value
+    without a distance matrix, over chunks of chunk_size rows to bound the temporary arrays.
+    """
     for col in columns:
-        uniq = np.unique(X_real[:,col])
-        dist = cdist(X_synth[:, col][:, np.newaxis].astype(float), uniq[:, np.newaxis].astype(float))
-        X_synth[:, col] = uniq[dist.argmin(axis=1)]
+        uniq = np.unique(X_real[:, col]).astype(float)
+        for start in range(0, len(X_synth), chunk_size):
+            values = X_synth[start:start + chunk_size, col].astype(float)
+            # The candidates are uniq[right - 1] and uniq[right], both uniq[0] for a single distinct value.
+            right = np.minimum(np.maximum(np.searchsorted(uniq, values), 1), len(uniq) - 1)
+            left = np.maximum(right - 1, 0)
+            nearest = np.where(values - uniq[left] <= uniq[right] - values, left, right)
+            X_synth[start:start + chunk_size, col] = uniq[nearest]
     return X_synth
 
 def concat_features(D : Dataset):
@@ -124,7 +124,8 @@ def child_training(
             cluster_col=y_col,
             d_layers=configs['classifier']['d_layers'],
             dim_t=configs['classifier']['dim_t'],
-            lr=configs['classifier']['lr']
+            lr=configs['classifier']['lr'],
+            eval_classifier=configs['classifier'].get('eval_classifier', True)
         )
         child_result['classifier'] = child_classifier
 
@@ -448,6 +448,90 @@ def min_max_normalize_sklearn(matrix):
 
     return normalized_data
 
+def get_discrete_columns(X_num_real):
+    """Numerical columns with at most 32 distinct integer values, which samples are rounded to."""
+    disc_cols = []
+    for col in range(X_num_real.shape[1]):
+        uniq_vals = np.unique(X_num_real[:, col])
+        if len(uniq_vals) <= 32 and ((uniq_vals - np.round(uniq_vals)) == 0).all():
+            disc_cols.append(col)
+    return disc_cols
+
+def get_decoding_info(df, df_info, dataset, label_encoders, is_y_cond):
+    """
+    Precomputes what decode_samples needs from the real table and the dataset of a model,
+    once per model instead of on every call.
+
+    :return: a dict with the number of features of the samples, the discrete columns and their
+        values 'disc_real', and the classes of all label encoded columns concatenated in 'categories',
+        so that one gather with the codes offset by 'category_offsets' decodes every column.
+    """
+    X_num_real = df[df_info['num_cols']].to_numpy().astype(float)
+    disc_cols = get_discrete_columns(X_num_real)
+    # round_columns only uses the distinct values of each discrete column, repeated to the same length here.
+    disc_values = [np.unique(X_num_real[:, col]) for col in disc_cols]
+    disc_real = np.zeros((max([len(values) for values in disc_values], default=0), X_num_real.shape[1]))
+    for col, values in zip(disc_cols, disc_values):
+        disc_real[:, col] = np.resize(values, len(disc_real))
+
+    categories = [label_encoders[col].classes_.astype(str).astype(object) for col in range(len(label_encoders))]
+    category_sizes = np.array([len(classes) for classes in categories], dtype=np.int64)
+
+    num_numerical_features = dataset.X_num['train'].shape[1] if dataset.X_num is not None else 0
+    return {
+        'num_transform': dataset.num_transform,
+        'num_numerical_features': num_numerical_features,
+        'num_numerical_features_sample': num_numerical_features + int(dataset.is_regression and not is_y_cond),
+        'actual_num_numerical_features': num_numerical_features - len(label_encoders),
+        'is_y_cond': is_y_cond,
+        'disc_cols': disc_cols,
+        'disc_real': disc_real,
+        'categories': np.concatenate([np.empty(0, dtype=object)] + categories),
+        'category_sizes': category_sizes,
+        'category_offsets': np.cumsum(category_sizes) - category_sizes,
+    }
+
+def make_typed_df(X_num, X_cat, y):
+    """A DataFrame with columns named by position, float for X_num and y, str for X_cat."""
+    columns = [X_num[:, col].astype(float) for col in range(X_num.shape[1])]
+    columns += [X_cat[:, col] for col in range(X_cat.shape[1])]
+    columns.append(y.reshape(-1).astype(float))
+    return pd.DataFrame({str(i): column for i, column in enumerate(columns)}, copy=False)
+
+def get_real_df(df, df_info):
+    """The real table in the layout of decode_samples."""
+    X_num_real = df[df_info['num_cols']].to_numpy().astype(float)
+    X_cat_real = df[df_info['cat_cols']].to_numpy().astype(str)
+    y_real = np.round(df[df_info['y_col']].to_numpy().astype(float)).astype(int)
+    return make_typed_df(X_num_real, X_cat_real, y_real)
+
+def decode_samples(X_gen, y_gen, decoding_info):
+    """
+    Inverse-transform the samples of a diffusion model into a DataFrame of numerical,
+    categorical and label columns, see make_typed_df.
+
+    :param decoding_info: see get_decoding_info.
+    """
+    info = decoding_info
+    X_num = np.empty((len(X_gen), 0))
+    X_cat = np.empty((len(X_gen), 0), dtype=object)
+
+    if info['num_numerical_features'] != 0:
+        X_num_ = info['num_transform'].inverse_transform(X_gen[:, :info['num_numerical_features_sample']])
+        X_num = X_num_[:, :info['actual_num_numerical_features']]
+
+        codes = np.round(X_num_[:, info['actual_num_numerical_features']:]).astype(np.int64)
+        codes = np.clip(codes, 0, info['category_sizes'] - 1) + info['category_offsets']
+        X_cat = info['categories'][codes]
+
+        if info['is_y_cond'] == 'concat':
+            y_gen = X_num[:, 0]
+            X_num = X_num[:, 1:]
+        if len(info['disc_cols']):
+            X_num = lib.round_columns(info['disc_real'], X_num, info['disc_cols'])
+
+    return make_typed_df(X_num, X_cat, np.round(y_gen).astype(int))
+
 def sample_from_diffusion(
         df, 
         df_info, 
@@ -457,7 +541,8 @@ def sample_from_diffusion(
         sample_size, 
         model_params, 
         T_dict,
-        sample_batch_size=8192
+        sample_batch_size=8192,
+        decoding_info=None
     ):
     num_numerical_features = dataset.X_num['train'].shape[1] if dataset.X_num is not None else 0
 
@@ -472,70 +557,66 @@ def sample_from_diffusion(
     _, empirical_class_dist = torch.unique(torch.from_numpy(dataset.y['train']), return_counts=True)
     x_gen, y_gen = diffusion.sample_all(sample_size, sample_batch_size, empirical_class_dist.float(), ddim=False)
     X_gen, y_gen = x_gen.numpy(), y_gen.numpy()
-    num_numerical_features_sample = num_numerical_features + int(dataset.is_regression and not model_params["is_y_cond"])
 
-    X_num_real = df[df_info['num_cols']].to_numpy().astype(float)
-    X_cat_real = df[df_info['cat_cols']].to_numpy().astype(str)
-    y_real = np.round(df[df_info['y_col']].to_numpy().astype(float)).astype(int).reshape(-1, 1)
-
-    X_num_ = X_gen
-
-    if num_numerical_features != 0:
-        X_num_ = dataset.num_transform.inverse_transform(X_gen[:, :num_numerical_features_sample])
-        actual_num_numerical_features = num_numerical_features - len(label_encoders)
-        X_num = X_num_[:, :actual_num_numerical_features]
-        if len(label_encoders) > 0:
-            X_cat = X_num_[:, actual_num_numerical_features:]
-            X_cat = np.round(X_cat).astype(int)
-            decoded_x_cat = []
-            for col in range(X_cat.shape[1]):
-                x_cat_col = X_cat[:, col]
-                x_cat_col = np.clip(x_cat_col, 0, len(label_encoders[col].classes_) - 1)
-                decoded_x_cat.append(label_encoders[col].inverse_transform(x_cat_col))
-            X_cat = np.column_stack(decoded_x_cat)
-        else:
-            X_cat = np.empty((X_num.shape[0], 0))
-
-        disc_cols = []
-        for col in range(X_num_real.shape[1]):
-            uniq_vals = np.unique(X_num_real[:, col])
-            if len(uniq_vals) <= 32 and ((uniq_vals - np.round(uniq_vals)) == 0).all():
-                disc_cols.append(col)
-        # print("Discrete cols:", disc_cols)
-        if model_params['is_y_cond'] == 'concat':
-            y_gen = X_num[:, 0]
-            X_num = X_num[:, 1:]
-        if len(disc_cols):
-            X_num = lib.round_columns(X_num_real, X_num, disc_cols)
+    if decoding_info is None:
+        decoding_info = get_decoding_info(df, df_info, dataset, label_encoders, model_params['is_y_cond'])
+    df_total = get_real_df(df, df_info)
+    df_gen = decode_samples(X_gen, y_gen, decoding_info)
 
-    y_gen = y_gen.reshape(-1, 1)
+    return df_total, df_gen
 
-    if X_cat_real is not None:
-        total_real = np.concatenate((X_num_real, X_cat_real, y_real), axis=1)
-        gen_real = np.concatenate((X_num, X_cat, np.round(y_gen).astype(int)), axis=1)
-    else:
-        total_real = np.concatenate((X_num_real, y_real), axis=1)
-        gen_real = np.concatenate((X_num, np.round(y_gen).astype(int)), axis=1)
-
-    df_total = pd.DataFrame(total_real)
-    df_gen = pd.DataFrame(gen_real)
-    columns = [str(x) for x in list(df_total.columns)]
-
-    df_total.columns = columns
-    df_gen.columns = columns
-
-    for col in df_total.columns:
-        if int(col) < X_num_real.shape[1]:
-            df_total[col] = df_total[col].astype(float)
-            df_gen[col] = df_gen[col].astype(float)
-        elif X_cat_real is not None and int(col) < X_num_real.shape[1] + X_cat_real.shape[1]:
-            df_total[col] = df_total[col].astype(str)
-            df_gen[col] = df_gen[col].astype(str)
-        else:
-            df_total[col] = df_total[col].astype(float)
-            df_gen[col] = df_gen[col].astype(float)
+def sample_from_diffusion_to_file(
+        df,
+        df_info,
+        diffusion,
+        dataset,
+        label_encoders,
+        sample_size,
+        model_params,
+        path,
+        sample_batch_size=8192,
+        decoding_info=None
+    ):
+    """
+    Sample rows like sample_from_diffusion, and write each batch to a CSV or Parquet file,
+    depending on the extension of path, as soon as it is decoded. Memory depends on the batch
+    size only, not on sample_size.
 
-    return df_total, df_gen
+    The columns are named after df_info, num_cols, cat_cols and then y_col.
+
+    :return: the number of rows written.
+    """
+    _, empirical_class_dist = torch.unique(torch.from_numpy(dataset.y['train']), return_counts=True)
+    if decoding_info is None:
+        decoding_info = get_decoding_info(df, df_info, dataset, label_encoders, model_params['is_y_cond'])
+    columns = df_info['num_cols'] + df_info['cat_cols'] + [df_info['y_col']]
+    is_parquet = os.path.splitext(path)[1] == '.parquet'
+
+    num_rows = 0
+    parquet_writer = None
+    try:
+        for x_gen, y_gen in diffusion.iter_samples(
+            sample_batch_size, empirical_class_dist.float(), num_samples=sample_size
+        ):
+            df_gen = decode_samples(x_gen.numpy(), y_gen.numpy(), decoding_info)
+            df_gen.columns = columns
+
+            if is_parquet:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                table = pa.Table.from_pandas(df_gen, preserve_index=False)
+                if parquet_writer is None:
+                    parquet_writer = pq.ParquetWriter(path, table.schema)
+                parquet_writer.write_table(table)
+            else:
+                df_gen.to_csv(path, mode='w' if num_rows == 0 else 'a', header=num_rows == 0, index=False)
+            num_rows += len(df_gen)
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
+
+    return num_rows
 
 def train_model(
         df, 
@@ -622,7 +703,8 @@ def train_model(
         'diffusion': diffusion,
         'label_encoders': label_encoders,
         'dataset': dataset,
-        'column_orders': column_orders
+        'column_orders': column_orders,
+        'decoding_info': get_decoding_info(df, df_info, dataset, label_encoders, model_params['is_y_cond'])
     }
 
 class Classifier(nn.Module):
@@ -673,6 +755,37 @@ class Classifier(nn.Module):
         x = self.model(x)
         return x
 
+class ClassifierGuidance:
+    """
+    Classifier guidance for the cond_fn of GaussianMultinomialDiffusion.sample and conditional_sample,
+    the gradient of classifier_scale * log p(y | x_t) with respect to x_t.
+
+    The gradient of the whole batch is computed by a single backward pass with respect to x_t only,
+    which is exact since the rows do not interact in a classifier in eval mode, and the log
+    probabilities of the labels are selected with torch.gather. On timesteps outside
+    guidance_interval, the classifier is not run and the sampling engine samples without guidance.
+
+    :param guidance_interval: the first and last timesteps with guidance, or None to guide every timestep.
+    """
+    def __init__(self, classifier, classifier_scale=1.0, guidance_interval=None):
+        self.classifier = classifier
+        self.classifier_scale = classifier_scale
+        self.guidance_interval = guidance_interval
+
+    def __call__(self, x, t, y=None, remove_first_col=False):
+        assert y is not None
+        if self.guidance_interval is not None:
+            start, end = self.guidance_interval
+            if not start <= int(t[0]) <= end:
+                return None
+        if remove_first_col:
+            x = x[:, 1:]
+        with torch.enable_grad():
+            x_in = x.detach().float().requires_grad_(True)
+            log_probs = F.log_softmax(self.classifier(x_in, t), dim=-1)
+            selected = torch.gather(log_probs, 1, y.long().to(x.device).view(-1, 1))
+            return torch.autograd.grad(selected.sum(), x_in)[0] * self.classifier_scale
+
 def split_microbatches(microbatch, *args):
     bs = len(args[0])
     if microbatch == -1 or microbatch >= bs:
@@ -688,6 +801,52 @@ def compute_top_k(logits, labels, k, reduction="mean"):
     elif reduction == "none":
         return (top_ks == labels[:, None]).float().sum(dim=-1)
 
+def evaluate_classifier(classifier, x, y, batch_size=8192, device='cuda', n_bins=10):
+    """
+    Evaluates the classifier at timestep 0 on x in chunks of batch_size rows.
+
+    :param x: the rows to classify, a tensor or an array.
+    :param y: the label of each row.
+    :param n_bins: the number of confidence bins of the expected calibration error.
+    :return: a dict with the 'accuracy', the 'confusion' matrix with a row for each true label
+        and a column for each output of the classifier,
+        and the expected calibration error 'ece' of the top predicted probability.
+    """
+    x = torch.as_tensor(x).float()
+    y = torch.as_tensor(y).long().reshape(-1)
+    confusion = None
+    bin_confidences = torch.zeros(n_bins)
+    bin_correct = torch.zeros(n_bins)
+
+    was_training = classifier.training
+    classifier.eval()
+    with torch.no_grad():
+        for x_batch, y_batch in zip(torch.split(x, batch_size), torch.split(y, batch_size)):
+            x_batch = x_batch.to(device)
+            logits = classifier(x_batch, timesteps=torch.zeros(x_batch.shape[0], device=device))
+            confidence, pred = F.softmax(logits.float(), dim=-1).max(dim=-1)
+            confidence, pred = confidence.cpu(), pred.cpu()
+            num_classes = logits.shape[-1]
+            if confusion is None:
+                confusion = torch.zeros(num_classes * num_classes, dtype=torch.long)
+            confusion += torch.bincount(y_batch * num_classes + pred, minlength=num_classes * num_classes)
+
+            bins = torch.clamp((confidence * n_bins).long(), max=n_bins - 1)
+            bin_confidences += torch.bincount(bins, weights=confidence, minlength=n_bins)
+            bin_correct += torch.bincount(bins, weights=(pred == y_batch).float(), minlength=n_bins)
+    classifier.train(was_training)
+
+    if confusion is None:
+        return {'accuracy': 0.0, 'confusion': np.zeros((0, 0), dtype=np.int64), 'ece': 0.0}
+    confusion = confusion.reshape(num_classes, num_classes).numpy()
+    # The gaps between the confidence and the accuracy of each bin, weighted by the rows in the bin.
+    ece = ((bin_confidences - bin_correct).abs().sum() / len(y)).item()
+    return {
+        'accuracy': np.trace(confusion) / len(y),
+        'confusion': confusion,
+        'ece': ece,
+    }
+
 def log_loss_dict(diffusion, ts, losses):
     for key, values in losses.items():
         logger.logkv_mean(key, values.mean().item())
@@ -757,7 +916,8 @@ def train_classifier(
         cluster_col='cluster',
         d_layers=None,
         dim_t=128,
-        lr=0.0001
+        lr=0.0001,
+        eval_classifier=True
     ):
     T = lib.Transformations(**T_dict)
     dataset, label_encoders, column_orders = make_dataset_from_df(
@@ -781,12 +941,6 @@ def train_classifier(
         batch_size=batch_size,
         y_type='long'
     )
-    test_loader = lib.prepare_fast_dataloader(
-        dataset, 
-        split='test', 
-        batch_size=batch_size,
-        y_type='long'
-    )
 
     eval_interval = 5
     log_interval = 10
@@ -863,20 +1017,19 @@ def train_classifier(
     # # test classifier
     classifier.eval()
 
-    correct = 0
-    for step in range(3000):
-        test_x, test_y = next(test_loader)
-        test_y = test_y.long().to(device)
+    if eval_classifier:
+        test_x, test_y = next(lib.prepare_fast_dataloader(
+            dataset,
+            split='test',
+            batch_size=len(dataset.y['test']),
+            y_type='long'
+        ))
         if model_params['is_y_cond'] == 'concat':
-            test_x = test_x[:, 1:].to(device)
-        else:
-            test_x = test_x.to(device)
-        with torch.no_grad():
-            pred = classifier(test_x, timesteps=torch.zeros(test_x.shape[0]).to(device))
-            correct += (pred.argmax(dim=1) == test_y).sum().item()
-
-    acc = correct / (3000 * batch_size)
-    print(acc)
+            test_x = test_x[:, 1:]
+        report = evaluate_classifier(
+            classifier, test_x, test_y, batch_size=batch_size, device=device
+        )
+        print(report['accuracy'])
 
     return classifier
 
@@ -892,41 +1045,22 @@ def conditional_sampling_by_group_size(
         sample_batch_size,
         group_lengths_prob_dicts,
         is_y_cond,
-        classifier_scale
+        classifier_scale,
+        guidance_interval=None,
+        rng=None,
+        decoding_info=None
     ):
-    def cond_fn(x, t, y=None, remove_first_col=False):
-        
-        assert y is not None
-        with torch.enable_grad():
-            if remove_first_col:
-                x_in = x[:, 1:].detach().requires_grad_(True).float()
-            else:
-                x_in = x.detach().requires_grad_(True).float()
-            logits = classifier(x_in, t)
-            log_probs = F.log_softmax(logits, dim=-1)
-            selected = log_probs[range(len(logits)), y.view(-1)]
-            return torch.autograd.grad(selected.sum(), x_in)[0] * classifier_scale
-
-    sampled_group_sizes = []
-    ys = []
-    for group_label in group_labels:
-        if not group_label in group_lengths_prob_dicts:
-            sampled_group_sizes.append(0)
-            continue
-        sampled_group_size = sample_from_dict(group_lengths_prob_dicts[group_label])
-        sampled_group_sizes.append(sampled_group_size)
-        ys.extend([group_label] * sampled_group_size)
+    cond_fn = ClassifierGuidance(classifier, classifier_scale, guidance_interval)
 
+    group_size_table = get_group_size_table(group_lengths_prob_dicts)
+    sampled_group_sizes, ys = sample_group_sizes(group_labels, group_size_table, rng)
 
     all_rows = []
     all_clusters = []
     curr_index = 0
     while curr_index < len(ys):
         end_index = min(curr_index + sample_batch_size, len(ys))
-        curr_ys = torch.tensor(
-            np.array(ys[curr_index:end_index]).reshape(-1, 1),
-            requires_grad=False
-        )
+        curr_ys = torch.from_numpy(ys[curr_index:end_index].reshape(-1, 1))
         curr_model_kwargs = {}
         curr_model_kwargs["y"] = curr_ys
         curr_sample, _ = diffusion.conditional_sample(
@@ -940,70 +1074,11 @@ def conditional_sampling_by_group_size(
 
     arr = np.concatenate(all_rows, axis=0)
     cluster_arr = np.concatenate(all_clusters, axis=0)
-    
-    num_numerical_features = dataset.X_num['train'].shape[1] if dataset.X_num is not None else 0
-
-    X_gen, y_gen = arr, cluster_arr
-    num_numerical_features_sample = num_numerical_features + int(dataset.is_regression and not is_y_cond)
-
-
-    X_num_real = df[df_info['num_cols']].to_numpy().astype(float)
-    X_cat_real = df[df_info['cat_cols']].to_numpy().astype(str)
-    y_real = np.round(df[df_info['y_col']].to_numpy().astype(float)).astype(int).reshape(-1, 1)
-
-    X_num_ = X_gen
-
-    if num_numerical_features != 0:
-        X_num_ = dataset.num_transform.inverse_transform(X_gen[:, :num_numerical_features_sample])
-        actual_num_numerical_features = num_numerical_features - len(label_encoders)
-        X_num = X_num_[:, :actual_num_numerical_features]
-        if len(label_encoders) > 0:
-            X_cat = X_num_[:, actual_num_numerical_features:]
-            X_cat = np.round(X_cat).astype(int)
-            decoded_x_cat = []
-            for col in range(X_cat.shape[1]):
-                decoded_x_cat.append(label_encoders[col].inverse_transform(X_cat[:, col]))
-            X_cat = np.column_stack(decoded_x_cat)
-
-        disc_cols = []
-        for col in range(X_num_real.shape[1]):
-            uniq_vals = np.unique(X_num_real[:, col])
-            if len(uniq_vals) <= 32 and ((uniq_vals - np.round(uniq_vals)) == 0).all():
-                disc_cols.append(col)
-        # print("Discrete cols:", disc_cols)
-        if is_y_cond == 'concat':
-            y_gen = X_num[:, 0]
-            X_num = X_num[:, 1:]
-        if len(disc_cols):
-            X_num = lib.round_columns(X_num_real, X_num, disc_cols)
-
-    y_gen = y_gen.reshape(-1, 1)
-
-    if X_cat_real is not None and X_cat_real.shape[1] > 0:
-        total_real = np.concatenate((X_num_real, X_cat_real, y_real), axis=1)
-        gen_real = np.concatenate((X_num, X_cat, np.round(y_gen).astype(int)), axis=1)
 
-    else:
-        total_real = np.concatenate((X_num_real, y_real), axis=1)
-        gen_real = np.concatenate((X_num, np.round(y_gen).astype(int)), axis=1)
-
-    df_total = pd.DataFrame(total_real)
-    df_gen = pd.DataFrame(gen_real)
-    columns = [str(x) for x in list(df_total.columns)]
-
-    df_total.columns = columns
-    df_gen.columns = columns
-
-    for col in df_total.columns:
-        if int(col) < X_num_real.shape[1]:
-            df_total[col] = df_total[col].astype(float)
-            df_gen[col] = df_gen[col].astype(float)
-        elif X_cat_real is not None and int(col) < X_num_real.shape[1] + X_cat_real.shape[1]:
-            df_total[col] = df_total[col].astype(str)
-            df_gen[col] = df_gen[col].astype(str)
-        else:
-            df_total[col] = df_total[col].astype(float)
-            df_gen[col] = df_gen[col].astype(float)
+    if decoding_info is None:
+        decoding_info = get_decoding_info(df, df_info, dataset, label_encoders, is_y_cond)
+    df_total = get_real_df(df, df_info)
+    df_gen = decode_samples(arr, cluster_arr, decoding_info)
 
     return df_total, df_gen, sampled_group_sizes
 
@@ -1021,19 +1096,10 @@ def conditional_sampling(
         is_y_cond,
         classifier_scale=1.0,
         device='cuda',
+        guidance_interval=None,
+        decoding_info=None,
     ):
-    
-    def cond_fn(x, t, y=None, remove_first_col=False):
-        assert y is not None
-        with torch.enable_grad():
-            if remove_first_col:
-                x_in = x[:, 1:].detach().requires_grad_(True).float()
-            else:
-                x_in = x.detach().requires_grad_(True).float()
-            logits = classifier(x_in, t)
-            log_probs = F.log_softmax(logits, dim=-1)
-            selected = log_probs[range(len(logits)), y.view(-1)]
-            return torch.autograd.grad(selected.sum(), x_in)[0] * classifier_scale
+    cond_fn = ClassifierGuidance(classifier, classifier_scale, guidance_interval)
 
     all_rows = []
     all_clusters = []
@@ -1064,88 +1130,78 @@ def conditional_sampling(
     cluster_arr = cluster_arr[:num_samples]
 
     # test how the condition goes
-    classifier.eval()
-    correct = 0
-    for i in range(len(arr)):
-        curr_sample = arr[i]
-        curr_label = cluster_arr[i].reshape(-1)
-        curr_sample = torch.from_numpy(curr_sample).float().to(device)
-        curr_label = torch.from_numpy(curr_label).long().to(device)
-        with torch.no_grad():
-            pred = classifier(curr_sample, timesteps=torch.zeros(curr_sample.shape[0]).to(device))
-            pred = pred.argmax()
-            correct += (pred.item() == curr_label[0].item())
-    acc = correct / len(arr)
-    print('classifier quality:', acc)
+    report = evaluate_classifier(
+        classifier, arr, cluster_arr, batch_size=sample_batch_size, device=device
+    )
+    print('classifier quality:', report['accuracy'], 'ECE:', report['ece'])
     print()
 
-    num_numerical_features = dataset.X_num['train'].shape[1] if dataset.X_num is not None else 0
-
-    X_gen, y_gen = arr, cluster_arr
-    num_numerical_features_sample = num_numerical_features + int(dataset.is_regression and not is_y_cond)
-
+    if decoding_info is None:
+        decoding_info = get_decoding_info(df, df_info, dataset, label_encoders, is_y_cond)
+    print("Discrete cols:", decoding_info['disc_cols'])
+    df_total = get_real_df(df, df_info)
+    df_gen = decode_samples(arr, cluster_arr, decoding_info)
 
-    X_num_real = df[df_info['num_cols']].to_numpy().astype(float)
-    X_cat_real = df[df_info['cat_cols']].to_numpy().astype(str)
-    y_real = np.round(df[df_info['y_col']].to_numpy()).astype(int).reshape(-1, 1)
-
-    X_num_ = X_gen
-
-    if num_numerical_features != 0:
-        X_num_ = dataset.num_transform.inverse_transform(X_gen[:, :num_numerical_features_sample])
-        actual_num_numerical_features = num_numerical_features - len(label_encoders)
-        X_num = X_num_[:, :actual_num_numerical_features]
-        if len(label_encoders) > 0:
-            X_cat = X_num_[:, actual_num_numerical_features:]
-            X_cat = np.round(X_cat).astype(int)
-            decoded_x_cat = []
-            for col in range(X_cat.shape[1]):
-                decoded_x_cat.append(label_encoders[col].inverse_transform(X_cat[:, col]))
-            X_cat = np.column_stack(decoded_x_cat)
-        else:
-            X_cat = np.empty((X_num.shape[0], 0))
-
-        disc_cols = []
-        for col in range(X_num_real.shape[1]):
-            uniq_vals = np.unique(X_num_real[:, col])
-            if len(uniq_vals) <= 32 and ((uniq_vals - np.round(uniq_vals)) == 0).all():
-                disc_cols.append(col)
-        print("Discrete cols:", disc_cols)
-        if is_y_cond == 'concat':
-            y_gen = X_num[:, 0]
-            X_num = X_num[:, 1:]
-        if len(disc_cols):
-            X_num = lib.round_columns(X_num_real, X_num, disc_cols)
+    return df_total, df_gen
 
-    y_gen = y_gen.reshape(-1, 1)
 
-    if X_cat_real is not None and X_cat_real.shape[1] > 0:
-        total_real = np.concatenate((X_num_real, X_cat_real, y_real), axis=1)
-        gen_real = np.concatenate((X_num, X_cat, np.round(y_gen).astype(int)), axis=1)
-    else:
-        total_real = np.concatenate((X_num_real, y_real), axis=1)
-        gen_real = np.concatenate((X_num, np.round(y_gen).astype(int)), axis=1)
+def get_group_size_table(group_lengths_prob_dicts):
+    """
+    Precomputes the distributions of group_lengths_prob_dicts for sample_group_sizes.
+
+    The CDF of the group sizes of the i-th group label is offset by i, so the CDFs of all
+    group labels are sorted in one array, and np.searchsorted samples from all of them at once.
+
+    :param group_lengths_prob_dicts: the probabilities of the group sizes of each group label.
+    :return: a dict with the sorted group labels 'labels', the concatenated group sizes 'sizes'
+        and offset CDFs 'cdfs' of all group labels, and the index 'ends' of the last group size
+        of each group label.
+    """
+    labels = np.array(sorted(group_lengths_prob_dicts), dtype=np.int64)
+    sizes = [np.zeros(0, dtype=np.int64)]
+    cdfs = [np.zeros(0)]
+    for i, label in enumerate(labels):
+        prob_dict = group_lengths_prob_dicts[label]
+        cdf = np.cumsum(np.fromiter(prob_dict.values(), dtype=float, count=len(prob_dict)))
+        # The probabilities may not sum to 1 exactly, the last group size must be reachable.
+        cdfs.append(cdf / cdf[-1] + i)
+        sizes.append(np.fromiter(prob_dict.keys(), dtype=np.int64, count=len(prob_dict)))
+    return {
+        'labels': labels,
+        'sizes': np.concatenate(sizes),
+        'cdfs': np.concatenate(cdfs),
+        'ends': np.cumsum([len(size) for size in sizes[1:]], dtype=np.int64) - 1,
+    }
 
-    
-    df_total = pd.DataFrame(total_real)
-    df_gen = pd.DataFrame(gen_real)
-    columns = [str(x) for x in list(df_total.columns)]
-
-    df_total.columns = columns
-    df_gen.columns = columns
-
-    for col in df_total.columns:
-        if int(col) < X_num_real.shape[1]:
-            df_total[col] = df_total[col].astype(float)
-            df_gen[col] = df_gen[col].astype(float)
-        elif X_cat_real is not None and int(col) < X_num_real.shape[1] + X_cat_real.shape[1]:
-            df_total[col] = df_total[col].astype(str)
-            df_gen[col] = df_gen[col].astype(str)
-        else:
-            df_total[col] = df_total[col].astype(float)
-            df_gen[col] = df_gen[col].astype(float)
 
-    return df_total, df_gen
+def sample_group_sizes(group_labels, group_size_table, rng=None):
+    """
+    Samples a group size for each group label, as sample_from_dict does, with one np.searchsorted.
+
+    :param group_labels: the group label of each parent row.
+    :param group_size_table: see get_group_size_table.
+    :param rng: a seed or np.random.Generator, a fresh generator if None.
+    :return: the group size of each group label, 0 for labels without a distribution,
+        and the group label of each sampled row.
+    """
+    rng = np.random.default_rng(rng)
+    group_labels = np.asarray(group_labels, dtype=np.int64).reshape(-1)
+    labels = group_size_table['labels']
+    sampled_group_sizes = np.zeros(len(group_labels), dtype=np.int64)
+    if len(labels) == 0:
+        return sampled_group_sizes, group_labels[:0]
+
+    positions = np.minimum(np.searchsorted(labels, group_labels), len(labels) - 1)
+    known = labels[positions] == group_labels
+    positions = positions[known]
+
+    # A uniform number in [i, i + 1) falls in the CDF of the i-th group label, up to rounding.
+    u = rng.random(len(positions)) + positions
+    indices = np.minimum(np.searchsorted(group_size_table['cdfs'], u, side='right'), group_size_table['ends'][positions])
+
+    sampled_group_sizes[known] = group_size_table['sizes'][indices]
+    ys = np.repeat(group_labels, sampled_group_sizes)
+    return sampled_group_sizes, ys
 
 
 def sample_from_dict(probabilities):
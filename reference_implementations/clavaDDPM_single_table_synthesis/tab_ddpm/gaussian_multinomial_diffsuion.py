@@ -5,7 +5,13 @@ and https://github.com/ehoogeboom/multinomial_diffusion
 
 import torch.nn.functional as F
 import torch
+import itertools
 import math
+import multiprocessing
+import os
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 from .utils import *
@@ -59,6 +65,104 @@ def betas_for_alpha_bar(num_diffusion_timesteps, alpha_bar, max_beta=0.999):
         betas.append(min(1 - alpha_bar(t2) / alpha_bar(t1), max_beta))
     return np.array(betas)
 
+DEFAULT_SAMPLING_CONFIG = {
+    'compile': False,
+    'progress_interval': 1.0,
+    'sampling_steps': None,
+    'n_workers': 1,
+    'seed': None,
+    'inference_mode': False,
+    'autocast_dtype': None,
+    'num_threads': None,
+}
+
+# Arguments of sample_all shared by the shards sampled in a worker process, set once per process.
+_sampling_worker_state = {}
+
+def _init_sampling_worker(diffusion, y_dist, ddim, model_kwargs, cond_fn, max_nan_retries):
+    # The workers share the cores, which the processes parallelize over instead of the threads.
+    torch.set_num_threads(1)
+    _sampling_worker_state.update(
+        diffusion=diffusion,
+        y_dist=y_dist,
+        ddim=ddim,
+        model_kwargs=model_kwargs,
+        cond_fn=cond_fn,
+        max_nan_retries=max_nan_retries,
+    )
+
+def _sample_shard_in_worker(shard_size, seed):
+    state = dict(_sampling_worker_state)
+    return state.pop('diffusion').sample_shard(shard_size, seed, **state)
+
+def space_timesteps(num_timesteps, sampling_steps=None):
+    """
+    Get the timesteps of the diffusion process that a respaced reverse process runs on.
+
+    :param num_timesteps: the number of timesteps the model was trained with.
+    :param sampling_steps: None to run on every timestep, a number of evenly spaced
+                           timesteps, eg. 50 of 2000, or a sequence of timesteps.
+    :return: the sorted timesteps, from 0 to the last one.
+    """
+    if sampling_steps is None:
+        return np.arange(num_timesteps)
+    if isinstance(sampling_steps, int):
+        assert 2 <= sampling_steps <= num_timesteps, \
+            f'Cannot sample with {sampling_steps} steps of {num_timesteps} timesteps.'
+        return np.round(np.linspace(0, num_timesteps - 1, sampling_steps)).astype(int)
+
+    timesteps = np.unique(np.asarray(sampling_steps, dtype=int))
+    assert len(timesteps) >= 2 and timesteps[0] >= 0 and timesteps[-1] < num_timesteps, \
+        f'Timesteps must be at least 2 distinct values in [0, {num_timesteps}).'
+    return timesteps
+
+def gaussian_sampling_step(x, model_out, noise, coefs, gradient=None, eps_parametrization=True):
+    """
+    One reverse step of the Gaussian part for a batch sharing the same timestep.
+
+    :param coefs: the row of the timestep in the Gaussian table of _get_sampling_tables.
+    :param gradient: the gradient of cond_fn, which shifts the mean, if any.
+    """
+    recip, recipm1, coef1, coef2, variance, std = coefs.unbind()
+    pred_xstart = recip * x - recipm1 * model_out if eps_parametrization else model_out
+    mean = coef1 * pred_xstart + coef2 * x
+    if gradient is not None:
+        mean = mean + variance * gradient.float()
+    return mean + std * noise
+
+def multinomial_sampling_step(
+    model_out, log_x_t, uniform, coefs, log_num_classes, offsets, pad_index, max_classes, x0_parametrization=True
+):
+    """
+    One reverse step of the multinomial part for a batch sharing the same timestep, all
+    categorical columns at once.
+
+    :param coefs: the row of the timestep in the multinomial table of _get_sampling_tables.
+    :param pad_index: the position of each one-hot entry in a (num_columns, max_classes) grid.
+    :return: the log one-hot sample and the sampled category of each column.
+    """
+    log_cumprod_prev, log_1_min_cumprod_prev, log_alpha, log_1_min_alpha, is_last = coefs.unbind()
+    log_x_start = model_out - sliced_logsumexp(model_out, offsets)
+    log_prob = log_x_start
+    if x0_parametrization:
+        # q(x_{t-1} | x_t, x_0), see q_posterior.
+        log_EV_qxtmin_x0 = log_add_exp(log_x_start + log_cumprod_prev, log_1_min_cumprod_prev - log_num_classes)
+        log_EV_qxtmin_x0 = torch.where(is_last > 0, log_x_start, log_EV_qxtmin_x0)
+        unnormed_logprobs = log_EV_qxtmin_x0 + log_add_exp(log_x_t + log_alpha, log_1_min_alpha - log_num_classes)
+        log_prob = unnormed_logprobs - sliced_logsumexp(unnormed_logprobs, offsets)
+
+    # Gumbel-max sampling of every column at once, on a grid padded with -inf.
+    gumbel_noise = -torch.log(-torch.log(uniform + 1e-30) + 1e-30)
+    padded = torch.full(
+        (log_prob.shape[0], (len(offsets) - 1) * max_classes), -float('inf'), device=log_prob.device
+    )
+    padded[:, pad_index] = gumbel_noise + log_prob
+    categories = padded.view(log_prob.shape[0], len(offsets) - 1, max_classes).argmax(dim=2)
+
+    log_sample = torch.full_like(log_prob, math.log(1e-30))
+    log_sample.scatter_(1, offsets[:-1] + categories, 0.0)
+    return log_sample, categories
+
 class GaussianMultinomialDiffusion(torch.nn.Module):
     def __init__(
             self,
@@ -990,34 +1094,12 @@ class GaussianMultinomialDiffusion(torch.nn.Module):
         z_norm = torch.randn((b, self.num_numerical_features), device=device)
         has_cat = self.num_classes[0] != 0
         log_z = torch.zeros((b, 0), device=device).float()
+        if has_cat:
+            uniform_logits = torch.zeros((b, len(self.num_classes_expanded)), device=device)
+            log_z = self.log_sample_categorical(uniform_logits)
 
         out_dict = {'y': ys.long().to(device)}
-        for i in reversed(range(0, self.num_timesteps)):
-            print(f'Sample timestep {i:4d}', end='\r')
-            t = torch.full((b,), i, device=device, dtype=torch.long)
-            model_out = self._denoise_fn(
-                torch.cat([z_norm, log_z], dim=1).float(),
-                t,
-                **out_dict
-            )
-            model_out_num = model_out[:, :self.num_numerical_features]
-            model_out_cat = model_out[:, self.num_numerical_features:]
-            z_norm = self.gaussian_p_sample(
-                model_out_num, 
-                z_norm, 
-                t, 
-                clip_denoised=False,
-                model_kwargs=model_kwargs, 
-                cond_fn=cond_fn
-            )['sample']
-            if has_cat:
-                log_z = self.p_sample(model_out_cat, log_z, t, out_dict)
-
-        print()
-        z_ohe = torch.exp(log_z).round()
-        z_cat = log_z
-        if has_cat:
-            z_cat = ohe_to_categories(z_ohe, self.num_classes)
+        z_norm, z_cat = self._sample_loop(z_norm, log_z, out_dict, model_kwargs=model_kwargs, cond_fn=cond_fn)
         sample = torch.cat([z_norm, z_cat], dim=1).cpu()
         return sample, out_dict
     
@@ -1040,60 +1122,354 @@ class GaussianMultinomialDiffusion(torch.nn.Module):
             replacement=True
         )
         out_dict = {'y': y.long().to(device)}
-        for i in reversed(range(0, self.num_timesteps)):
-            print(f'Sample timestep {i:4d}', end='\r')
-            t = torch.full((b,), i, device=device, dtype=torch.long)
-            model_out = self._denoise_fn(
-                torch.cat([z_norm, log_z], dim=1).float(),
-                t,
-                **out_dict
-            )
-            model_out_num = model_out[:, :self.num_numerical_features]
-            model_out_cat = model_out[:, self.num_numerical_features:]
-            z_norm = self.gaussian_p_sample(
-                model_out_num, 
-                z_norm, 
-                t, 
-                clip_denoised=False,
-                model_kwargs=model_kwargs, 
-                cond_fn=cond_fn
-            )['sample']
-            if has_cat:
-                log_z = self.p_sample(model_out_cat, log_z, t, out_dict)
-
-        print()
-        z_ohe = torch.exp(log_z).round()
-        z_cat = log_z
-        if has_cat:
-            z_cat = ohe_to_categories(z_ohe, self.num_classes)
+        z_norm, z_cat = self._sample_loop(z_norm, log_z, out_dict, model_kwargs=model_kwargs, cond_fn=cond_fn)
         sample = torch.cat([z_norm, z_cat], dim=1).cpu()
         return sample, out_dict
-    
-    def sample_all(self, num_samples, batch_size, y_dist, ddim=False, model_kwargs=None, cond_fn=None):
+
+    def configure_sampling(self, **config):
+        """
+        Set the options of the sampling engine used by sample and conditional_sample, see
+        DEFAULT_SAMPLING_CONFIG.
+
+        :param compile: compile the denoiser and the sampling steps with torch.compile.
+        :param progress_interval: minimum number of seconds between two progress reports.
+        :param sampling_steps: the timesteps of the reverse process, see space_timesteps.
+        :param n_workers: the number of processes of sample_all.
+        :param seed: the master seed of sample_all.
+        :param inference_mode: sample under torch.inference_mode, except with a cond_fn,
+                               which needs gradients.
+        :param autocast_dtype: the dtype the denoiser runs in under torch.autocast, eg.
+                               'bfloat16', or None to run it in float32.
+        :param num_threads: the number of intra-op threads while sampling, or None to keep
+                            the current number, which lib sets to 1.
+        """
+        unknown = set(config) - set(DEFAULT_SAMPLING_CONFIG)
+        assert not unknown, f'Unknown sampling options: {unknown}'
+        self._sampling_config = {**self._get_sampling_config(), **config}
+        self.__dict__.pop('_sampling_fns', None)
+
+    def _get_sampling_config(self):
+        # Models pickled before the sampling engine existed have no sampling config.
+        return {**DEFAULT_SAMPLING_CONFIG, **getattr(self, '_sampling_config', {})}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_sampling_fns', None)
+        state.pop('_sampling_tables', None)
+        return state
+
+    def _get_sampling_tables(self, device):
+        """
+        Coefficients of every step of the reverse process, as float32 tables indexed by step.
+
+        The reverse process runs on the timesteps of space_timesteps. Between two of them,
+        the noise schedule is respaced to alpha = alpha_bar / alpha_bar_prev, which keeps
+        the marginals of the timesteps the model was trained on, for both the Gaussian
+        and the multinomial parts.
+
+        The Gaussian table holds sqrt(1 / alpha_bar), sqrt(1 / alpha_bar - 1), the two posterior
+        mean coefficients, the model variance and the standard deviation of the noise, which is
+        zero at the last step. The multinomial table holds log(alpha_bar) and log(1 - alpha_bar)
+        at the previous step, log(alpha) and log(1 - alpha) at the step, and whether it
+        is the last step.
+        """
+        timesteps = space_timesteps(self.num_timesteps, self._get_sampling_config()['sampling_steps'])
+        key = (device, tuple(timesteps))
+        tables = self.__dict__.setdefault('_sampling_tables', {})
+        if key not in tables:
+            alphas = 1. - get_named_beta_schedule(self.scheduler, self.num_timesteps)
+            alphas_cumprod = np.cumprod(alphas.astype('float64'))[timesteps]
+            alphas_cumprod_prev = np.append(1.0, alphas_cumprod[:-1])
+            alphas = alphas_cumprod / alphas_cumprod_prev
+            betas = 1. - alphas
+
+            posterior_variance = betas * (1.0 - alphas_cumprod_prev) / (1.0 - alphas_cumprod)
+            model_variance = np.append(posterior_variance[1], betas[1:])
+            std = np.sqrt(model_variance)
+            std[0] = 0.
+            gaussian_table = np.stack([
+                np.sqrt(1.0 / alphas_cumprod),
+                np.sqrt(1.0 / alphas_cumprod - 1),
+                betas * np.sqrt(alphas_cumprod_prev) / (1.0 - alphas_cumprod),
+                (1.0 - alphas_cumprod_prev) * np.sqrt(alphas) / (1.0 - alphas_cumprod),
+                model_variance,
+                std,
+            ], axis=1)
+
+            log_alpha = torch.from_numpy(np.log(alphas))
+            log_cumprod_alpha_prev = torch.from_numpy(np.log(alphas_cumprod_prev))
+            multinomial_table = torch.stack([
+                log_cumprod_alpha_prev,
+                log_1_min_a(log_cumprod_alpha_prev),
+                log_alpha,
+                log_1_min_a(log_alpha),
+                torch.from_numpy(timesteps == timesteps[0]).double(),
+            ], dim=1)
+
+            num_classes = [int(k) for k in self.num_classes]
+            max_classes = max(num_classes)
+            pad_index = torch.cat([
+                torch.arange(k) + column * max_classes for column, k in enumerate(num_classes)
+            ])
+            tables[key] = {
+                'timesteps': timesteps.tolist(),
+                'gaussian': torch.from_numpy(gaussian_table).float().to(device),
+                'multinomial': multinomial_table.float().to(device),
+                'log_num_classes': torch.log(self.num_classes_expanded.float()).to(device),
+                'offsets': self.offsets.to(device),
+                'pad_index': pad_index.to(device),
+                'max_classes': max_classes,
+            }
+        return tables[key]
+
+    def _get_sampling_fns(self):
+        # Cached along with the denoiser they were built for, which may be replaced.
+        denoise_fn, fns = self.__dict__.get('_sampling_fns', (None, None))
+        if denoise_fn is not self._denoise_fn:
+            fns = (self._denoise_fn, gaussian_sampling_step, multinomial_sampling_step)
+            if self._get_sampling_config()['compile']:
+                fns = tuple(torch.compile(fn) for fn in fns)
+            self.__dict__['_sampling_fns'] = (self._denoise_fn, fns)
+        return fns
+
+    @torch.no_grad()
+    def _sample_loop(self, z_norm, log_z, out_dict, model_kwargs=None, cond_fn=None):
+        """
+        Run the reverse process on a batch with the sampling engine, on the timesteps of
+        the sampling_steps option.
+
+        All the rows of the batch share the timestep, so the coefficients of each step are
+        read from precomputed tables instead of being gathered per row. The input of the
+        denoiser is allocated once and updated in place. The sampling steps always run in
+        float32, even when the denoiser is autocast.
+
+        :return: the numerical features and the category indices of the categorical features.
+        """
+        config = self._get_sampling_config()
+        device = z_norm.device
+        b = z_norm.shape[0]
+        n_num = self.num_numerical_features
+        n_onehot = log_z.shape[1]
+        has_cat = n_onehot > 0
+        model_kwargs = {} if model_kwargs is None else model_kwargs
+
+        tables = self._get_sampling_tables(device)
+        denoise_fn, gaussian_step, multinomial_step = self._get_sampling_fns()
+        eps_parametrization = self.gaussian_parametrization == 'eps'
+
+        autocast_dtype = config['autocast_dtype']
+        if autocast_dtype is not None:
+            autocast_dtype = getattr(torch, autocast_dtype)
+
+        num_threads = torch.get_num_threads()
+        if config['num_threads'] is not None:
+            torch.set_num_threads(config['num_threads'])
+        try:
+            # cond_fn differentiates through the samples, which inference tensors cannot be.
+            with torch.inference_mode(config['inference_mode'] and cond_fn is None):
+                x_in = torch.empty((b, n_num + n_onehot), device=device)
+                x_in[:, :n_num] = z_norm
+                x_in[:, n_num:] = log_z
+                t = torch.empty((b,), device=device, dtype=torch.long)
+                categories = torch.zeros((b, 0), device=device, dtype=torch.long)
+                if has_cat:
+                    categories = ohe_to_categories(log_z.exp().round().cpu(), self.num_classes).to(device)
+
+                last_report = -float('inf')
+                for i, timestep in reversed(list(enumerate(tables['timesteps']))):
+                    if time.perf_counter() - last_report >= config['progress_interval'] or i == 0:
+                        print(f'Sample timestep {timestep:4d}', end='\r')
+                        last_report = time.perf_counter()
+
+                    t.fill_(timestep)
+                    if autocast_dtype is None:
+                        model_out = denoise_fn(x_in, t, **out_dict)
+                    else:
+                        with torch.autocast(device.type, dtype=autocast_dtype):
+                            model_out = denoise_fn(x_in, t, **out_dict).float()
+                    z_norm = x_in[:, :n_num]
+                    noise = torch.randn_like(z_norm)
+                    gradient = cond_fn(z_norm, t, **model_kwargs) if cond_fn is not None else None
+                    x_in[:, :n_num] = gaussian_step(
+                        z_norm, model_out[:, :n_num], noise, tables['gaussian'][i], gradient, eps_parametrization
+                    )
+                    if has_cat:
+                        x_in[:, n_num:], categories = multinomial_step(
+                            model_out[:, n_num:],
+                            x_in[:, n_num:],
+                            torch.rand((b, n_onehot), device=device),
+                            tables['multinomial'][i],
+                            tables['log_num_classes'],
+                            tables['offsets'],
+                            tables['pad_index'],
+                            tables['max_classes'],
+                            self.parametrization == 'x0',
+                        )
+        finally:
+            torch.set_num_threads(num_threads)
+
+        print()
+        # Cloned out of inference mode, so that the samples can be used like any tensor.
+        return x_in[:, :n_num].clone(), categories.clone()
+
+    def sample_shard(
+        self, shard_size, seed, y_dist, ddim=False, model_kwargs=None, cond_fn=None, max_nan_retries=10
+    ):
+        """
+        Sample a shard of sample_all with its own seed, without changing the state of the
+        random generators of the caller.
+
+        Rows with NaNs are dropped and sampled again, up to max_nan_retries times.
+
+        :return: the samples, their labels, the number of rows sampled again, the sampling time
+                 and the id of the process.
+        """
+        sample_fn = self.sample_ddim if ddim else self.sample
+        device = self.log_alpha.device
+        start = time.perf_counter()
+
+        all_samples = []
+        all_y = []
+        num_generated = 0
+        num_nans = 0
+        with torch.random.fork_rng(devices=[device] if device.type == 'cuda' else []):
+            torch.manual_seed(seed)
+            for _ in range(max_nan_retries + 1):
+                sample, out_dict = sample_fn(
+                    shard_size - num_generated, y_dist, model_kwargs=model_kwargs, cond_fn=cond_fn
+                )
+                mask_nan = torch.any(sample.isnan(), dim=1)
+                all_samples.append(sample[~mask_nan])
+                all_y.append(out_dict['y'][~mask_nan].cpu())
+                num_generated += int((~mask_nan).sum())
+                num_nans += int(mask_nan.sum())
+                if num_generated == shard_size:
+                    break
+            else:
+                raise FoundNANsError(
+                    f'Found NANs in {shard_size - num_generated} rows after {max_nan_retries} retries.'
+                )
+
+        return torch.cat(all_samples), torch.cat(all_y), num_nans, time.perf_counter() - start, os.getpid()
+
+    def _iter_shards(self, shard_sizes, seed, n_workers, shard_args):
+        # Each shard draws its seed from the master seed, in order.
+        seed_sequence = np.random.SeedSequence(seed)
+        shard_seeds = (int(seed_sequence.spawn(1)[0].generate_state(1)[0]) for _ in itertools.count())
+        if n_workers == 1:
+            for size, shard_seed in zip(shard_sizes, shard_seeds):
+                yield self.sample_shard(size, shard_seed, *shard_args)
+            return
+
+        # At most two shards per worker are in flight, so that memory does not grow with the
+        # number of shards when they are consumed slower than they are sampled.
+        # Workers are spawned rather than forked from a process in which torch already started
+        # its threads, and receive the model pickled, see __getstate__.
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_sampling_worker,
+            initargs=(self, *shard_args),
+        ) as executor:
+            pending = deque()
+            try:
+                for size, shard_seed in zip(shard_sizes, shard_seeds):
+                    pending.append(executor.submit(_sample_shard_in_worker, size, shard_seed))
+                    if len(pending) == 2 * n_workers:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def iter_samples(
+        self,
+        batch_size,
+        y_dist,
+        num_samples=None,
+        ddim=False,
+        model_kwargs=None,
+        cond_fn=None,
+        n_workers=None,
+        seed=None,
+        max_nan_retries=10,
+    ):
+        """
+        Sample rows in shards of batch_size rows, on a pool of processes, and yield each shard
+        as soon as it is sampled, so that memory does not depend on the number of rows.
+
+        Each shard is sampled with its own seed derived from the master seed, so the samples
+        only depend on the seed and the batch size, not on the number of workers, and are
+        yielded in the order of the shards. Rows with NaNs are sampled again, see sample_shard.
+
+        :param num_samples: the number of rows, or None to sample until the generator is closed.
+        :param n_workers: the number of processes. If 1, the shards are sampled in this process.
+                          Defaults to the n_workers sampling option, see configure_sampling.
+                          Workers are spawned, so this model, cond_fn and model_kwargs must be
+                          picklable, and scripts must guard their entry point with
+                          `if __name__ == '__main__'`.
+        :param seed: the master seed. Defaults to the seed sampling option, or to a seed drawn
+                     from the torch random generator if it is None.
+        :return: a generator of the samples of each shard and their labels.
+        """
+        config = self._get_sampling_config()
+        n_workers = config['n_workers'] if n_workers is None else n_workers
+        seed = config['seed'] if seed is None else seed
+        if seed is None:
+            seed = int(torch.randint(0, 2 ** 62, ()))
         if ddim:
             print('Sample using DDIM.')
-            sample_fn = self.sample_ddim
+
+        if num_samples is None:
+            shard_sizes = itertools.repeat(batch_size)
         else:
-            sample_fn = self.sample
-        
-        b = batch_size
+            shard_sizes = (min(batch_size, num_samples - start) for start in range(0, num_samples, batch_size))
+        shard_args = (y_dist, ddim, model_kwargs, cond_fn, max_nan_retries)
+
+        worker_stats = defaultdict(lambda: [0, 0., 0])
+        try:
+            for sample, y, num_nans, sampling_time, pid in self._iter_shards(shard_sizes, seed, n_workers, shard_args):
+                worker_stats[pid][0] += len(sample)
+                worker_stats[pid][1] += sampling_time
+                worker_stats[pid][2] += num_nans
+                yield sample, y
+        finally:
+            for worker, (num_rows, sampling_time, num_nans) in enumerate(worker_stats.values()):
+                print(
+                    f'Sampling worker {worker}: {num_rows} rows in {sampling_time:.1f}s '
+                    f'({num_rows / max(sampling_time, 1e-9):.0f} rows/s), {num_nans} rows with NaNs sampled again'
+                )
 
-        all_y = []
-        all_samples = []
-        num_generated = 0
-        while num_generated < num_samples:
-            sample, out_dict = sample_fn(b, y_dist, model_kwargs=model_kwargs, cond_fn=cond_fn)
-            mask_nan = torch.any(sample.isnan(), dim=1)
-            sample = sample[~mask_nan]
-            out_dict['y'] = out_dict['y'][~mask_nan]
-
-            all_samples.append(sample)
-            all_y.append(out_dict['y'].cpu())
-            if sample.shape[0] != b:
-                raise FoundNANsError
-            num_generated += sample.shape[0]
-
-        x_gen = torch.cat(all_samples, dim=0)[:num_samples]
-        y_gen = torch.cat(all_y, dim=0)[:num_samples]
-
-        return x_gen, y_gen
\ No newline at end of file
+    def sample_all(
+        self,
+        num_samples,
+        batch_size,
+        y_dist,
+        ddim=False,
+        model_kwargs=None,
+        cond_fn=None,
+        n_workers=None,
+        seed=None,
+        max_nan_retries=10,
+    ):
+        """
+        Sample num_samples rows, see iter_samples.
+
+        :return: the samples and their labels.
+        """
+        shards = list(self.iter_samples(
+            batch_size,
+            y_dist,
+            num_samples=num_samples,
+            ddim=ddim,
+            model_kwargs=model_kwargs,
+            cond_fn=cond_fn,
+            n_workers=n_workers,
+            seed=seed,
+            max_nan_retries=max_nan_retries,
+        ))
+        x_gen = torch.cat([shard[0] for shard in shards], dim=0)
+        y_gen = torch.cat([shard[1] for shard in shards], dim=0)
+
+        return x_gen, y_gen
@@ -0,0 +1,350 @@
+"Copy engine shared by the extraction scripts: the copies are planned up front and run in parallel."
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Sequence
+
+from midst.mappings import MappingIndex
+
+
+# Describes the model types, partitions and rounds of the competition data, and the files of each output.
+SPEC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "extraction_spec.json")
+
+# Records what was copied into an output tree, so that reruns only copy new or changed files.
+MANIFEST_FILE_NAME = ".extraction_manifest.json"
+
+
+@dataclass(frozen=True)
+class CopyTask:
+    source: str
+    destination: str
+    size: int
+
+
+def plan_copy(source: str, destination: str) -> list[CopyTask]:
+    """Plans the copy of a file, or of every file of a directory, to `destination`."""
+    if not os.path.isdir(source):
+        return [CopyTask(source, destination, os.path.getsize(source))]
+
+    tasks = []
+    for root, _, files in os.walk(source):
+        for f in sorted(files):
+            relative_path = os.path.relpath(os.path.join(root, f), source)
+            tasks.extend(plan_copy(os.path.join(source, relative_path), os.path.join(destination, relative_path)))
+    return tasks
+
+
+def print_plan(plan: Sequence[CopyTask]) -> None:
+    for task in plan:
+        print(f"{task.source} -> {task.destination} ({task.size} bytes)")
+
+    unique_sources = {task.source: task.size for task in plan}
+    print(
+        f"{len(plan)} files, {sum(task.size for task in plan)} bytes, of which "
+        f"{len(unique_sources)} distinct source files, {sum(unique_sources.values())} bytes."
+    )
+
+
+def load_spec(spec_path: str = SPEC_PATH) -> dict[str, Any]:
+    with open(spec_path) as f:
+        return json.load(f)
+
+
+def get_mapping_index(spec: dict[str, Any], base_dir: Path) -> MappingIndex:
+    """Returns the index of the mapping files of the rounds of the spec in `base_dir`."""
+    round_mapping_files = [round_spec["mapping_file"] for round_spec in spec["rounds"]]
+    return MappingIndex(str(base_dir), round_mapping_files, spec["merged_mapping_file"])
+
+
+def expand_files(model_folder_dir: str, patterns: Sequence[str], tables: Sequence[str]) -> list[str]:
+    """Expands the file patterns of a spec into paths relative to a model folder.
+
+    A pattern containing "{table}" is repeated for each table of the model type, then a pattern
+    containing glob wildcards is replaced by the paths it matches in the model folder.
+    """
+    paths = []
+    for pattern in patterns:
+        for path in dict.fromkeys(pattern.format(table=table) for table in tables):
+            if glob.has_magic(path):
+                paths.extend(sorted(glob.glob(path, root_dir=model_folder_dir)))
+            else:
+                paths.append(path)
+    return list(dict.fromkeys(paths))
+
+
+def plan_extraction(spec: dict[str, Any], output: str, base_dir: Path, write_dir: Path) -> list[CopyTask]:
+    """Plans the copies of an output of the spec, eg. "data" or "solution", over all rounds.
+
+    Each extraction of the output is written to "{model}_{attack_type}" in `write_dir`, with
+    one directory per partition and model folder. Files are copied to the root of their model
+    folder, directories keep their path relative to the model folder.
+
+    Args:
+        spec (dict[str, Any]): The spec, see `load_spec`.
+        output (str): Name of the output.
+        base_dir (Path): Directory of the competition data, with the mapping files.
+        write_dir (Path): Root of the output tree.
+
+    Returns:
+        list[CopyTask]: The copies.
+    """
+    mapping_index = get_mapping_index(spec, base_dir)
+
+    plan = []
+    for extraction in spec["outputs"][output]:
+        model, attack_type = extraction["model"], extraction["attack_type"]
+        tables = spec["models"][model]["tables"]
+        extraction_write_dir = os.path.join(write_dir, f"{model}_{attack_type}")
+
+        for round_index, round_spec in enumerate(spec["rounds"]):
+            model_dir = round_spec["model_dir"].format(model=model)
+            for partition, patterns in extraction["files"].items():
+                if partition not in round_spec["partitions"]:
+                    continue
+
+                partition_spec = spec["partitions"][partition]
+                mapping_key = partition_spec["mapping_key"].format(attack_type=attack_type)
+                for model_folder in mapping_index.get_existing_folders(model, mapping_key, model_dir, round_index):
+                    model_folder_dir = os.path.join(base_dir, model_dir, model_folder)
+                    partition_model_write_dir = os.path.join(extraction_write_dir, partition_spec["write_dir"], model_folder)
+                    for f in expand_files(model_folder_dir, patterns, tables):
+                        copy_path = os.path.join(model_folder_dir, f)
+                        if os.path.isdir(copy_path):
+                            plan.extend(plan_copy(copy_path, os.path.join(partition_model_write_dir, f)))
+                        else:
+                            plan.extend(plan_copy(copy_path, os.path.join(partition_model_write_dir, os.path.basename(f))))
+
+    return plan
+
+
+def hash_file(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def load_manifest(write_dir: str) -> dict[str, dict]:
+    manifest_path = os.path.join(write_dir, MANIFEST_FILE_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def _is_up_to_date(task: CopyTask, entry: dict | None) -> bool:
+    if entry is None or entry["source"] != task.source or not os.path.exists(task.destination):
+        return False
+    source_stat = os.stat(task.source)
+    destination_stat = os.stat(task.destination)
+    return (
+        (source_stat.st_size, source_stat.st_mtime_ns) == (entry["source_size"], entry["source_mtime_ns"])
+        and (destination_stat.st_size, destination_stat.st_mtime_ns) == (entry["size"], entry["mtime_ns"])
+    )
+
+
+def _copy_source(tasks: Sequence[CopyTask], link: bool) -> dict[str, dict]:
+    # The source is copied once, the other destinations are hard links to the first copy.
+    source_stat = os.stat(tasks[0].source)
+    first_destination = tasks[0].destination
+    shutil.copy(tasks[0].source, first_destination)
+    for task in tasks[1:]:
+        if os.path.exists(task.destination):
+            os.remove(task.destination)
+        try:
+            if not link:
+                raise OSError("Hard links disabled.")
+            os.link(first_destination, task.destination)
+        except OSError:
+            shutil.copy(first_destination, task.destination)
+
+    sha256 = hash_file(first_destination)
+    entries = {}
+    for task in tasks:
+        destination_stat = os.stat(task.destination)
+        entries[task.destination] = {
+            "source": task.source,
+            "source_size": source_stat.st_size,
+            "source_mtime_ns": source_stat.st_mtime_ns,
+            "size": destination_stat.st_size,
+            "mtime_ns": destination_stat.st_mtime_ns,
+            "sha256": sha256,
+        }
+    return entries
+
+
+def execute_plan(
+    plan: Sequence[CopyTask], write_dir: str, n_workers: int | None = None, link: bool = True
+) -> None:
+    """Runs the copies of a plan on a thread pool, storing each distinct source file once.
+
+    The copies are recorded in a manifest at the root of `write_dir`, with the size and
+    modification time of their source and destination and the hash of their content. Copies
+    whose source and destination are unchanged since they were recorded are skipped.
+
+    Args:
+        plan (Sequence[CopyTask]): The copies, whose destinations are in `write_dir`.
+        write_dir (str): Root of the output tree.
+        n_workers (int | None, optional): Number of copying threads. Defaults to None, the
+            default of ThreadPoolExecutor.
+        link (bool, optional): Whether the destinations of a source file copied more than once
+            are hard links to a single copy. Files are copied when hard links are not supported.
+            Defaults to True.
+    """
+    manifest = load_manifest(write_dir)
+
+    tasks_by_source = {}
+    for task in dict.fromkeys(plan):
+        tasks_by_source.setdefault(task.source, []).append(task)
+
+    def is_up_to_date(tasks: Sequence[CopyTask]) -> bool:
+        return all(_is_up_to_date(task, manifest.get(os.path.relpath(task.destination, write_dir))) for task in tasks)
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        up_to_date = list(executor.map(is_up_to_date, tasks_by_source.values()))
+        stale = [tasks for tasks, skip in zip(tasks_by_source.values(), up_to_date) if not skip]
+
+        for destination_dir in {os.path.dirname(task.destination) for tasks in stale for task in tasks}:
+            os.makedirs(destination_dir, exist_ok=True)
+
+        # Consuming the results raises the first error of the copies, if any.
+        for entries in executor.map(lambda tasks: _copy_source(tasks, link), stale):
+            manifest.update({os.path.relpath(destination, write_dir): entry for destination, entry in entries.items()})
+
+    os.makedirs(write_dir, exist_ok=True)
+    with open(os.path.join(write_dir, MANIFEST_FILE_NAME), "w") as f:
+        json.dump(manifest, f, indent=4)
+
+    n_copied = sum(len(tasks) for tasks in stale)
+    print(f"Copied {n_copied} files, {len(plan) - n_copied} files were up to date.")
+
+
+def _get_archive_member(task: CopyTask, write_dir: str) -> tuple[str, str]:
+    # Eg. "tabddpm_black_box/dev/tabddpm_3/challenge_with_id.csv" is the member
+    # "tabddpm_3/challenge_with_id.csv" of "tabddpm_black_box/dev.zip".
+    parts = Path(os.path.relpath(task.destination, write_dir)).parts
+    return os.path.join(*parts[:2]) + ".zip", "/".join(parts[2:])
+
+
+def _write_archive(archive_path: str, members: dict[str, str], sources: dict[str, list]) -> dict:
+    # The archive is written under a temporary name first, so that an interrupted write is never reused.
+    os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+    with zipfile.ZipFile(archive_path + ".tmp", "w", zipfile.ZIP_STORED) as zipf:
+        for member, source in sorted(members.items()):
+            zipf.write(source, member)
+    os.replace(archive_path + ".tmp", archive_path)
+
+    archive_stat = os.stat(archive_path)
+    return {
+        "sources": sources,
+        "size": archive_stat.st_size,
+        "mtime_ns": archive_stat.st_mtime_ns,
+        "sha256": hash_file(archive_path),
+    }
+
+
+def execute_plan_as_archives(plan: Sequence[CopyTask], write_dir: str, n_workers: int | None = None) -> None:
+    """Writes the copies of a plan as one zip archive per partition, eg. "tabddpm_black_box/dev.zip".
+
+    Members are stored uncompressed and named after their path in the model folder, eg.
+    "tabddpm_3/challenge_with_id.csv", so that `midst.data` reads them in place through the
+    index of the archive. An archive is only rebuilt when one of its sources changed, and is
+    recorded in the same manifest as copied files.
+
+    Args:
+        plan (Sequence[CopyTask]): The copies, whose destinations are in `write_dir`.
+        write_dir (str): Root of the output tree.
+        n_workers (int | None, optional): Number of threads writing archives. Defaults to None,
+            the default of ThreadPoolExecutor.
+    """
+    manifest = load_manifest(write_dir)
+
+    archives = {}
+    for task in dict.fromkeys(plan):
+        archive, member = _get_archive_member(task, write_dir)
+        archives.setdefault(archive, {})[member] = task.source
+
+    def get_sources(members: dict[str, str]) -> dict[str, list]:
+        sources = {}
+        for member, source in members.items():
+            stat = os.stat(source)
+            sources[member] = [source, stat.st_size, stat.st_mtime_ns]
+        return sources
+
+    def write_archive(archive: str) -> dict | None:
+        archive_path = os.path.join(write_dir, archive)
+        sources = get_sources(archives[archive])
+        entry = manifest.get(archive)
+        if entry is not None and entry["sources"] == sources and os.path.exists(archive_path):
+            archive_stat = os.stat(archive_path)
+            if (archive_stat.st_size, archive_stat.st_mtime_ns) == (entry["size"], entry["mtime_ns"]):
+                return None
+        return _write_archive(archive_path, archives[archive], sources)
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        entries = dict(zip(archives, executor.map(write_archive, archives)))
+
+    manifest.update({archive: entry for archive, entry in entries.items() if entry is not None})
+    os.makedirs(write_dir, exist_ok=True)
+    with open(os.path.join(write_dir, MANIFEST_FILE_NAME), "w") as f:
+        json.dump(manifest, f, indent=4)
+
+    n_written = sum(entry is not None for entry in entries.values())
+    print(f"Wrote {n_written} archives of {len(plan)} files, {len(archives) - n_written} archives were up to date.")
+
+
+def verify_manifest(write_dir: str, n_workers: int | None = None) -> None:
+    """Checks in parallel that every file recorded in the manifest of `write_dir` is intact.
+
+    Raises:
+        AssertionError: If some files are missing or their content changed.
+    """
+    manifest = load_manifest(write_dir)
+    assert len(manifest) > 0, f"No extraction manifest found in {write_dir}."
+
+    def is_intact(item: tuple[str, dict]) -> bool:
+        path, entry = os.path.join(write_dir, item[0]), item[1]
+        return os.path.exists(path) and os.path.getsize(path) == entry["size"] and hash_file(path) == entry["sha256"]
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        corrupted = [path for path, intact in zip(manifest, executor.map(is_intact, manifest.items())) if not intact]
+
+    assert len(corrupted) == 0, f"Missing or modified files in {write_dir}: {corrupted}"
+    print(f"Verified {len(manifest)} files in {write_dir}.")
+
+
+def main(output: str, default_write_dir: Path) -> None:
+    """Command line entry point of the extraction scripts, which extract an output of the spec."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base_dir", type=Path, required=False, default=Path("./midst_data"))
+    parser.add_argument("--write_dir", type=Path, required=False, default=default_write_dir)
+    parser.add_argument("--spec", type=str, required=False, default=SPEC_PATH)
+    parser.add_argument("--n_workers", type=int, required=False, default=None)
+    parser.add_argument("--no_links", action="store_true", help="Copy files used several times instead of hard linking them.")
+    parser.add_argument("--dry_run", action="store_true", help="Only print the copies and their total size.")
+    parser.add_argument("--verify", action="store_true", help="Only check the extracted files against the manifest.")
+    parser.add_argument(
+        "--archive", action="store_true", help="Write each partition as one zip archive instead of a tree of files."
+    )
+    args = parser.parse_args()
+
+    if args.verify:
+        verify_manifest(args.write_dir, args.n_workers)
+        return
+
+    plan = plan_extraction(load_spec(args.spec), output, args.base_dir, args.write_dir)
+    if args.dry_run:
+        print_plan(plan)
+    elif args.archive:
+        execute_plan_as_archives(plan, args.write_dir, args.n_workers)
+    else:
+        execute_plan(plan, args.write_dir, args.n_workers, link=not args.no_links)
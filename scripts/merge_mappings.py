@@ -5,33 +5,40 @@ import os
 import json
 
 from pathlib import Path
+from typing import Any
 
+from extraction import SPEC_PATH, get_mapping_index, load_spec
+from midst.mappings import MappingIndex
 
-def merge_mapping_files(base_dir: Path, model_name: str) -> None:
-    round1_path = os.path.join(base_dir, f"{model_name}_mapping.json")
-    round2_path = os.path.join(base_dir, f"{model_name}_round2_mapping.json")
 
-    assert os.path.exists(round1_path), f"File not found: {round1_path}"
-    assert os.path.exists(round2_path), f"File not found: {round2_path}"
+def merge_mapping_files(mapping_index: MappingIndex, model_name: str, spec: dict[str, Any]) -> None:
+    round_mappings = mapping_index.get_round_mappings(model_name)
+    for mapping_file, mapping in zip(mapping_index.round_mapping_files, round_mappings):
+        path = os.path.join(mapping_index.base_dir, mapping_file.format(model=model_name))
+        assert mapping is not None, f"File not found: {path}"
 
-    with open(round1_path, "r") as f1, open(round2_path, "r") as f2:
-        round1_data = json.load(f1)
-        round2_data = json.load(f2)
+    # Later rounds list the same partitions as the first round, except those they do not include, eg. shadow models.
+    for round_spec, mapping in zip(spec["rounds"][1:], round_mappings[1:]):
+        missing_keys = {
+            spec["partitions"][partition]["mapping_key"].format(attack_type=attack_type)
+            for partition in set(spec["partitions"]) - set(round_spec["partitions"])
+            for attack_type in ["black_box", "white_box"]
+        }
+        assert set(round_mappings[0].keys()) - missing_keys == set(mapping.keys()), "Keys do not match between JSON Files"
 
-    assert set(round1_data.keys()) - {"shadow"} == set(round2_data.keys()), "Keys do not match between JSON Files"
-
-    merged_data = {key: round1_data.get(key, []) + round2_data.get(key, []) for key in round1_data}
-    write_path = os.path.join(base_dir, f"{model_name}_mapping_final.json")
+    write_path = os.path.join(mapping_index.base_dir, mapping_index.merged_mapping_file.format(model=model_name))
 
     with open(write_path, "w") as f:
-        json.dump(merged_data, f, indent=4)
+        json.dump(mapping_index.get_merged_mapping(model_name), f, indent=4)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--base_dir", type=Path, required=False, default=Path("./midst_data"))
+    parser.add_argument("--spec", type=str, required=False, default=SPEC_PATH)
     args = parser.parse_args()
 
-    merge_mapping_files(args.base_dir, "tabsyn")
-    merge_mapping_files(args.base_dir, "tabddpm")
-    merge_mapping_files(args.base_dir, "clavaddpm")
-
+    spec = load_spec(args.spec)
+    # The mapping files of all model types are loaded once and merged in memory.
+    mapping_index = get_mapping_index(spec, args.base_dir)
+    for model_name in spec["models"]:
+        merge_mapping_files(mapping_index, model_name, spec)
@@ -0,0 +1,41 @@
+"Script to copy the shared scoring modules of the midst package into every Codabench scoring program."
+
+import argparse
+import filecmp
+import glob
+import os
+import shutil
+
+from pathlib import Path
+
+
+# Codabench runs each scoring program in isolation, so the modules it imports must live next to scoring.py.
+SHARED_MODULES = ["metrics.py", "ingestion.py", "mappings.py"]
+
+
+def sync_scoring_programs(repo_dir: Path, check: bool) -> None:
+    scoring_program_dirs = sorted(glob.glob(os.path.join(repo_dir, "codabench_bundles", "*", "scoring_programs", "*")))
+    assert len(scoring_program_dirs) > 0, f"No scoring programs found under {repo_dir}."
+
+    out_of_sync = []
+    for module in SHARED_MODULES:
+        source_path = os.path.join(repo_dir, "midst", module)
+        for scoring_program_dir in scoring_program_dirs:
+            target_path = os.path.join(scoring_program_dir, module)
+            if os.path.exists(target_path) and filecmp.cmp(source_path, target_path, shallow=False):
+                continue
+            if check:
+                out_of_sync.append(target_path)
+            else:
+                shutil.copyfile(source_path, target_path)
+
+    assert len(out_of_sync) == 0, f"Scoring program modules out of sync with midst/: {out_of_sync}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repo_dir", type=Path, required=False, default=Path(__file__).resolve().parents[1])
+    parser.add_argument("--check", action="store_true", help="Only verify that the copies are up to date.")
+    args = parser.parse_args()
+
+    sync_scoring_programs(args.repo_dir, args.check)
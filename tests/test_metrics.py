@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from sklearn.metrics import roc_curve
+
+from midst.metrics import StreamingTprAtFpr, get_tpr_at_fpr
+
+
+MAX_FPRS = [0.01, 0.1, 0.3]
+
+
+def get_labels_and_predictions(seed: int, decimals: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    n_points = int(rng.integers(100, 2000))
+    labels = rng.random(n_points) < 0.5
+    predictions = np.clip(rng.normal(0.5 + 0.1 * labels, 0.2), 0.0, 1.0)
+    if decimals is not None:
+        predictions = np.round(predictions, decimals)
+    return labels, predictions
+
+
+def get_best_tpr_at_fpr(labels: np.ndarray, predictions: np.ndarray, max_fpr: float) -> float:
+    # Best TPR over all the thresholds, without dropping collinear points.
+    fpr, tpr, _ = roc_curve(labels, predictions, drop_intermediate=False)
+    return float(tpr[fpr < max_fpr].max(initial=0.0))
+
+
+def stream(labels: np.ndarray, predictions: np.ndarray, mode: str, n_bins: int = 2**16) -> StreamingTprAtFpr:
+    scorer = StreamingTprAtFpr(mode, n_bins)
+    for chunk in np.array_split(np.arange(len(labels)), 3):
+        scorer.update(labels[chunk], predictions[chunk])
+    return scorer
+
+
+@pytest.mark.parametrize("decimals", [None, 1, 2])
+@pytest.mark.parametrize("seed", range(20))
+def test_streaming_exact_matches_get_tpr_at_fpr(seed: int, decimals: int | None) -> None:
+    labels, predictions = get_labels_and_predictions(seed, decimals)
+    scorer = stream(labels, predictions, "exact")
+    assert scorer.error_bound() == 0.0
+    for max_fpr in MAX_FPRS:
+        assert scorer.get_tpr_at_fpr(max_fpr) == pytest.approx(get_tpr_at_fpr(labels, predictions, max_fpr))
+
+
+@pytest.mark.parametrize("n_bins", [8, 64, 1024])
+@pytest.mark.parametrize("seed", range(20))
+def test_streaming_histogram_bound_without_ties(seed: int, n_bins: int) -> None:
+    labels, predictions = get_labels_and_predictions(seed)
+    scorer = stream(labels, predictions, "histogram", n_bins)
+    for max_fpr in MAX_FPRS:
+        tpr = get_tpr_at_fpr(labels, predictions, max_fpr)
+        assert tpr == pytest.approx(get_best_tpr_at_fpr(labels, predictions, max_fpr))
+        assert tpr - scorer.error_bound() - 1e-12 <= scorer.get_tpr_at_fpr(max_fpr) <= tpr + 1e-12
+
+
+@pytest.mark.parametrize("n_bins", [8, 64, 1024])
+@pytest.mark.parametrize("seed", range(20))
+def test_streaming_histogram_bound_with_ties(seed: int, n_bins: int) -> None:
+    labels, predictions = get_labels_and_predictions(seed, decimals=1 + seed % 2)
+    scorer = stream(labels, predictions, "histogram", n_bins)
+    for max_fpr in MAX_FPRS:
+        best_tpr = get_best_tpr_at_fpr(labels, predictions, max_fpr)
+        assert get_tpr_at_fpr(labels, predictions, max_fpr) <= best_tpr + 1e-12
+        assert best_tpr - scorer.error_bound() - 1e-12 <= scorer.get_tpr_at_fpr(max_fpr) <= best_tpr + 1e-12